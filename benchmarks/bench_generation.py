@@ -0,0 +1,93 @@
+"""
+Compare the two general-chat generation strategies on a live Ollama host.
+
+  - per_answer:  n separate calls (generate_multiple_answers)
+  - single_call: one schema-constrained call (generate_answers_single_call)
+
+For each strategy and question it records wall time, answers produced,
+output tokens (from Ollama's usage metadata) and tokens/sec.
+
+Usage: python -m benchmarks.bench_generation [--n 10] [--runs 3]
+"""
+import argparse
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.common import print_summary, record, summarize
+from src.query import (
+    GENERATION_CONCURRENCY,
+    generate_answers_single_call,
+    generate_multiple_answers,
+    get_pure_llm,
+    get_structured_llm,
+)
+
+QUESTIONS = [
+    "How do I keep my houseplants alive?",
+    "What is a good way to learn a new language?",
+    "Why is the sky blue?",
+]
+
+
+class TokenCounter(BaseCallbackHandler):
+    """Sums output tokens reported by the chat model across calls."""
+
+    def __init__(self):
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                with self._lock:
+                    self.output_tokens += usage.get("output_tokens", 0)
+
+
+def run_strategy(strategy, question, n, concurrency):
+    counter = TokenCounter()
+    start = time.perf_counter()
+    if strategy == "per_answer":
+        llm = get_pure_llm().with_config(callbacks=[counter])
+        answers = generate_multiple_answers(llm, question, n=n, concurrency=concurrency, stream=False)
+    else:
+        llm = get_structured_llm(n).with_config(callbacks=[counter])
+        answers = generate_answers_single_call(llm, question, n=n)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(answers), counter.output_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10, help="answers per question")
+    parser.add_argument("--runs", type=int, default=3, help="passes over the question set")
+    parser.add_argument("--concurrency", type=int, default=GENERATION_CONCURRENCY,
+                        help="per_answer concurrency")
+    args = parser.parse_args()
+
+    results = {}
+    for strategy in ("per_answer", "single_call"):
+        wall, tokens, answers = [], 0, 0
+        for _ in range(args.runs):
+            for question in QUESTIONS:
+                elapsed, produced, output_tokens = run_strategy(strategy, question, args.n, args.concurrency)
+                wall.append(elapsed)
+                tokens += output_tokens
+                answers += produced
+        stats = summarize(wall)
+        stats["answers_per_call"] = answers / len(wall)
+        stats["output_tokens"] = tokens
+        stats["tokens_per_sec"] = tokens / sum(wall) if sum(wall) else None
+        results[strategy] = stats
+
+    print_summary(f"generation (n={args.n}, wall time per question)", results)
+    for strategy, stats in results.items():
+        print(f"{strategy:<28}{stats['tokens_per_sec'] or 0:>10.1f} tokens/s"
+              f"{stats['answers_per_call']:>8.1f} answers/question")
+    record("generation", results)
+
+
+if __name__ == "__main__":
+    main()
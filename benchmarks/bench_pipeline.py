@@ -0,0 +1,216 @@
+"""
+Offline end-to-end benchmark of the moderation/answer pipeline.
+
+Groq, Mistral, Ollama, Chroma and the embedding model are replaced by the
+local fakes in benchmarks/fakes.py (configurable latency and verdicts);
+everything else is the real code, including SQLite writes to a throwaway
+database. Each request goes through:
+
+  prompt moderation -> retrieval (RAG) -> generation -> answer moderation -> DB
+
+and p50/p95/p99 latency is reported per stage, with overall throughput.
+
+Usage:
+  python -m benchmarks.bench_pipeline [--requests 200] [--workers 4] [--mode mixed]
+  python -m benchmarks.bench_pipeline --max-p95 end_to_end=3.0   # non-zero exit if exceeded (CI)
+"""
+import argparse
+import contextlib
+import io
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from pathlib import Path
+
+import db.database
+import db.init_db
+import db.metrics
+import src.clients as clients
+import src.discriminator as discriminator
+import src.query as query
+import src.run_groq as run_groq
+from benchmarks.common import print_summary, record, summarize
+from benchmarks.fakes import (
+    FakeChatModel,
+    FakeEmbeddings,
+    FakeGroqClient,
+    FakeMistralClient,
+    FakeQAChain,
+    FakeRetriever,
+    FakeSettings,
+    _Latency,
+)
+from src.jsonl_log import JsonlWriter
+from src.preclassifier import preclassifier
+from src.semantic_cache import SemanticCache
+from src.verdict_cache import VerdictCache
+
+
+class StageTimer:
+    """Thread-safe collection of durations per stage."""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+
+def install_fakes(settings, workdir, timer, n_answers):
+    """Point the whole pipeline at local fakes and a fresh database in workdir."""
+    latency = _Latency(settings)
+    # The fakes have no quota: measure the pipeline, not the client-side rate limits
+    for provider in ("groq", "mistral"):
+        clients.set_rate_limit(provider, 0)
+
+    groq = FakeGroqClient(settings, latency)
+    groq.chat.completions.create = timer.wrap("groq_call", groq.create)
+    run_groq.set_client(groq)
+
+    discriminator.set_client(FakeMistralClient(settings, latency))
+    discriminator.classify_texts = timer.wrap("mistral_call", discriminator.classify_texts)
+
+    llm = FakeChatModel(settings, latency)
+    retriever = FakeRetriever(settings, latency)
+    retriever.invoke = timer.wrap("retrieval", retriever.invoke)
+    embeddings = FakeEmbeddings(settings, latency)
+    for name in ("llm", "pure_llm", f"structured_llm_{n_answers}"):
+        query.override_resource(name, llm)
+    query.override_resource("retriever", retriever)
+    query.override_resource("qa_chain", FakeQAChain(llm, retriever))
+    query.override_resource("embeddings", embeddings)
+    query.override_resource("answer_cache", SemanticCache(embeddings))
+    query.generate_rag_answer = timer.wrap("generation", query.generate_rag_answer)
+    preclassifier.set_embeddings(embeddings)
+
+    # Throwaway database and logs
+    db.database.close_connections()
+    db.database.DATABASE_PATH = db.init_db.DATABASE_PATH = workdir / "bench.db"
+    db.init_db.DATA_DIR = workdir
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.init_db.init_database()
+    run_groq.verdict_cache = VerdictCache()
+    discriminator.output_log = JsonlWriter(workdir / "output.jsonl")
+
+    for module, name in ((run_groq, "save_prompts"), (run_groq, "save_rejected_prompt"),
+                         (discriminator, "save_analyses")):
+        setattr(module, name, timer.wrap("db_write", getattr(module, name)))
+
+    return groq, llm
+
+
+def handle_request(prompt, rag, n_answers, timer):
+    start = time.perf_counter()
+
+    mod = timer.wrap("prompt_moderation", run_groq.groq_moderate_prompt)(prompt)
+    if mod["violation"] == 1:
+        timer.add("end_to_end_rejected", time.perf_counter() - start)
+        return "rejected"
+
+    if rag:
+        query.answer_rag(prompt, stream=False)
+    else:
+        answers = timer.wrap("generation", query.generate_answers)(prompt, n=n_answers, stream=False)
+        timer.wrap("answer_moderation", discriminator.moderate_multiple_texts)(
+            answers, prompt=prompt, row_ids=mod.get("row_ids")
+        )
+
+    timer.add("end_to_end", time.perf_counter() - start)
+    return "rag" if rag else "general"
+
+
+def parse_limits(values):
+    limits = {}
+    for value in values:
+        stage, _, seconds = value.partition("=")
+        limits[stage] = float(seconds)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent sessions")
+    parser.add_argument("--mode", choices=("rag", "general", "mixed"), default="mixed")
+    parser.add_argument("--answers", type=int, default=10, help="answers per general-chat request")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="number of distinct prompts (0 = all unique); lower values exercise the caches")
+    parser.add_argument("--max-p95", action="append", default=[], metavar="STAGE=SECONDS",
+                        help="fail if a stage's p95 exceeds this (repeatable)")
+    defaults = FakeSettings()
+    for field in fields(FakeSettings):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type,
+                            default=getattr(defaults, field.name))
+    args = parser.parse_args()
+
+    settings = FakeSettings(**{field.name: getattr(args, field.name) for field in fields(FakeSettings)})
+    timer = StageTimer()
+    outcomes = {}
+    outcomes_lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        groq, llm = install_fakes(settings, Path(workdir), timer, args.answers)
+        distinct = args.distinct or args.requests
+        prompts = [f"Benchmark question {i % distinct}: how does feature {i % distinct} work?"
+                   for i in range(args.requests)]
+
+        def run(i):
+            rag = args.mode == "rag" or (args.mode == "mixed" and i % 2 == 0)
+            outcome = handle_request(prompts[i], rag, args.answers, timer)
+            with outcomes_lock:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        start = time.perf_counter()
+        # The pipeline prints a lot: keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                list(pool.map(run, range(args.requests)))
+        wall = time.perf_counter() - start
+        # Stage metrics go to the throwaway database too
+        db.metrics.flush()
+        db.database.close_connections()
+
+    results = {stage: summarize(values) for stage, values in sorted(timer.samples.items())}
+    print_summary(f"pipeline ({args.requests} requests, {args.workers} workers, mode={args.mode})", results)
+    throughput = args.requests / wall
+    print(f"\nthroughput: {throughput:.1f} requests/s over {wall:.1f}s  outcomes: {outcomes}")
+    print(f"groq calls: {groq.calls}  llm calls: {llm.calls}  preclassifier: {preclassifier.stats()}")
+    print(f"clients: {clients.stats()}")
+
+    record("pipeline", {
+        "settings": vars(args),
+        "stages": results,
+        "throughput": throughput,
+        "outcomes": outcomes,
+    })
+
+    failed = []
+    for stage, limit in parse_limits(args.max_p95).items():
+        if stage not in results:
+            # A typo must not make the check pass silently
+            failed.append(f"unknown stage {stage!r} (measured: {', '.join(results)})")
+            continue
+        p95 = results[stage]["p95"]
+        if p95 is not None and p95 > limit:
+            failed.append(f"{stage} p95 {p95:.3f}s > {limit:.3f}s")
+    if failed:
+        print("\n❌ " + "\n❌ ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
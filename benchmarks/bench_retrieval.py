@@ -0,0 +1,109 @@
+"""
+Recall vs latency of the RAG retriever on the local ./chroma_db store.
+
+Ground truth is an exact (brute-force) nearest-neighbour search over every
+stored embedding. Each HNSW ef_search value and search type is then run
+through src/retrieval.py's Retriever (cache disabled) and reported as
+recall@k against the exact neighbours, with search latency. A last row
+shows the latency of a repeated question served from the result cache.
+
+Queries come from --queries (one per line) or are sampled from the stored
+chunks. The collection's original ef_search (or Chroma's default when it
+had none) is restored at the end.
+
+Usage: python -m benchmarks.bench_retrieval [--k 4] [--ef 10 50 100 200] [--samples 50]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import print_summary, record, summarize
+from src.query import get_docsearch, get_embeddings
+from src.retrieval import DEFAULT_SEARCH_EF, Retriever, get_search_ef, set_search_ef
+
+
+def exact_neighbours(matrix, vector, k, space):
+    if space == "cosine":
+        scores = -(matrix @ vector) / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector) + 1e-12)
+    elif space == "ip":
+        scores = -(matrix @ vector)
+    else:
+        scores = ((matrix - vector) ** 2).sum(axis=1)
+    return np.argsort(scores)[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--ef", type=int, nargs="+", default=[10, 50, 100, 200], help="HNSW ef_search values")
+    parser.add_argument("--queries", help="file with one query per line (default: sample stored chunks)")
+    parser.add_argument("--samples", type=int, default=50, help="queries sampled from the store")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docsearch = get_docsearch()
+    embeddings = get_embeddings()
+    stored = docsearch._collection.get(include=["documents", "embeddings"])
+    ids = stored["ids"]
+    matrix = np.asarray(stored["embeddings"], dtype=np.float32)
+    id_by_text = {text: id_ for id_, text in zip(ids, stored["documents"])}
+    configuration = docsearch._collection.configuration or {}
+    space = (configuration.get("hnsw") or {}).get("space") or "l2"
+    print(f"{len(ids)} stored chunks, distance: {space}")
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        rng = random.Random(args.seed)
+        queries = [text[:200] for text in rng.sample(stored["documents"], min(args.samples, len(ids)))]
+
+    vectors = [embeddings.embed_query(query) for query in queries]
+    truth = [{ids[i] for i in exact_neighbours(matrix, np.asarray(v, dtype=np.float32), args.k, space)}
+             for v in vectors]
+
+    original_ef = get_search_ef(docsearch)
+    results, recalls = {}, {}
+    try:
+        for ef in args.ef:
+            set_search_ef(docsearch, ef)
+            for search_type in ("similarity", "mmr"):
+                retriever = Retriever(docsearch, embeddings, k=args.k, fetch_k=args.fetch_k,
+                                      search_type=search_type, score_threshold=0, cache_size=0)
+                durations, found = [], 0
+                for vector, expected in zip(vectors, truth):
+                    start = time.perf_counter()
+                    docs = retriever.search(vector)
+                    durations.append(time.perf_counter() - start)
+                    found += len({getattr(doc, "id", None) or id_by_text.get(doc.page_content)
+                                  for doc in docs} & expected)
+                name = f"{search_type} ef={ef}"
+                results[name] = summarize(durations)
+                recalls[name] = found / (args.k * len(queries))
+                results[name]["recall"] = recalls[name]
+
+        # Repeated questions: the second invoke is a cache hit (embedding + lookup)
+        retriever = Retriever(docsearch, embeddings, k=args.k)
+        durations = []
+        for query in queries:
+            retriever.invoke(query)
+            start = time.perf_counter()
+            retriever.invoke(query)
+            durations.append(time.perf_counter() - start)
+        results["cached invoke"] = summarize(durations)
+    finally:
+        # Always undo the benchmark's ef_search: back to Chroma's default when none was set
+        set_search_ef(docsearch, original_ef or DEFAULT_SEARCH_EF)
+
+    print_summary(f"retrieval (k={args.k}, {len(queries)} queries, search latency)", results)
+    print()
+    for name, recall in recalls.items():
+        print(f"{name:<28}recall@{args.k} {recall:.3f}")
+    record("retrieval", results)
+
+
+if __name__ == "__main__":
+    main()
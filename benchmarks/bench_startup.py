@@ -0,0 +1,72 @@
+"""
+Cold-start benchmark for the query pipeline.
+
+Each sample runs in a fresh interpreter and measures:
+  - import:       `import src.query`
+  - embeddings:   first get_embeddings() + one embed_query
+  - retrieval:    first get_docsearch() + one similarity search
+  - first_query:  first qa_chain.invoke (only with --full, needs Ollama)
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--full]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from config import PROJECT_DIR
+from benchmarks.common import print_summary, record, summarize
+
+SAMPLE_QUESTION = "What is this project about?"
+
+_CHILD = """
+import json, sys, time
+t = time.perf_counter()
+import src.query as q
+timings = {"import": time.perf_counter() - t}
+
+t = time.perf_counter()
+q.get_embeddings().embed_query(sys.argv[1])
+timings["embeddings"] = time.perf_counter() - t
+
+t = time.perf_counter()
+q.get_docsearch().similarity_search(sys.argv[1])
+timings["retrieval"] = time.perf_counter() - t
+
+if sys.argv[2] == "1":
+    t = time.perf_counter()
+    q.get_qa_chain().invoke({"question": sys.argv[1]})
+    timings["first_query"] = time.perf_counter() - t
+
+print(json.dumps(timings))
+"""
+
+
+def run_once(full):
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD, SAMPLE_QUESTION, "1" if full else "0"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    # Resource creation prints progress lines: the timings are the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--full", action="store_true", help="also time the first RAG answer (needs Ollama)")
+    args = parser.parse_args()
+
+    samples = {}
+    for i in range(args.runs):
+        for stage, seconds in run_once(args.full).items():
+            samples.setdefault(stage, []).append(seconds)
+        print(f"run {i + 1}/{args.runs} done")
+
+    results = {stage: summarize(values) for stage, values in samples.items()}
+    print_summary("startup", results)
+    record("startup", results)
+
+
+if __name__ == "__main__":
+    main()
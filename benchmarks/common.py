@@ -0,0 +1,45 @@
+import math
+import statistics
+import time
+
+from config import BENCHMARK_LOG_PATH
+from src.jsonl_log import JsonlWriter
+
+
+def percentile(values, p):
+    """Nearest-rank percentile (p in 0-100) of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(values):
+    """Latency summary of a list of durations in seconds."""
+    return {
+        "n": len(values),
+        "mean": statistics.fmean(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def print_summary(title, rows):
+    """Print {name: summarize(...)} as a small table, in milliseconds."""
+    print(f"\n=== {title} ===")
+    print(f"{'stage':<28}{'n':>6}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in rows.items():
+        cells = [stats[k] * 1000 if stats[k] is not None else float("nan")
+                 for k in ("mean", "p50", "p95", "p99")]
+        print(f"{name:<28}{stats['n']:>6}" + "".join(f"{c:>10.1f}" for c in cells))
+
+
+benchmark_log = JsonlWriter(BENCHMARK_LOG_PATH)
+
+
+def record(benchmark, results):
+    """Append one benchmark run to BENCHMARK_LOG_PATH so runs can be compared over time."""
+    benchmark_log.append({"benchmark": benchmark, "timestamp": time.time(), "results": results})
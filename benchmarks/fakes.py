@@ -0,0 +1,214 @@
+"""
+Local stand-ins for Groq, Mistral, Ollama, Chroma and the embedding model.
+
+Each fake mimics the small part of the client API the pipeline uses and
+sleeps for a configurable latency (with optional jitter) instead of doing
+network or model work, so the whole pipeline can run offline.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from src.discriminator import CATEGORIES
+
+
+@dataclass
+class FakeSettings:
+    groq_latency: float = 0.30
+    mistral_latency: float = 0.20
+    llm_latency: float = 0.80
+    token_latency: float = 0.005
+    retrieval_latency: float = 0.03
+    embedding_latency: float = 0.005
+    jitter: float = 0.2             # +/- fraction of each latency
+    violation_rate: float = 0.1     # share of prompts Groq rejects
+    flag_rate: float = 0.1          # share of answers Mistral flags
+    seed: int = 0
+
+
+class _Latency:
+    def __init__(self, settings):
+        self.settings = settings
+        self._random = random.Random(settings.seed)
+        self._lock = threading.Lock()
+
+    def random(self):
+        with self._lock:
+            return self._random.random()
+
+    def delay(self, seconds):
+        jitter = self.settings.jitter
+        return max(0.0, seconds * (1 + jitter * (2 * self.random() - 1)))
+
+    def sleep(self, seconds):
+        time.sleep(self.delay(seconds))
+
+
+# ---------- Groq ----------
+
+class FakeGroqClient:
+    """client.chat.completions.create(messages=..., model=...)"""
+
+    def __init__(self, settings, latency=None):
+        self.settings = settings
+        self.latency = latency or _Latency(settings)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _verdict(self):
+        violation = int(self.latency.random() < self.settings.violation_rate)
+        return {
+            "violation": violation,
+            "category": "Harmful Content" if violation else None,
+            "rationale": "fake verdict " + "with a longer explanation " * 8,
+            "safety_tags": {},
+        }
+
+    def create(self, messages, model, **kwargs):
+        self.calls += 1
+        self.latency.sleep(self.settings.groq_latency)
+        if "BATCH MODE" in messages[0]["content"]:
+            # Batch contract: one verdict per {"index", "text"} item
+            items = json.loads(messages[-1]["content"])
+            content = json.dumps([{"index": item["index"], **self._verdict()} for item in items])
+        else:
+            content = json.dumps(self._verdict())
+        if kwargs.get("stream"):
+            return self._stream(content)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, content):
+        # The latency above was time to first token; the rest arrives token by token
+        for i in range(0, len(content), 4):
+            time.sleep(self.latency.delay(self.settings.token_latency))
+            delta = SimpleNamespace(content=content[i:i + 4])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+# ---------- Mistral ----------
+
+class FakeMistralClient:
+    """client.classifiers.moderate_chat(model=..., inputs=...)"""
+
+    def __init__(self, settings, latency=None):
+        self.settings = settings
+        self.latency = latency or _Latency(settings)
+        self.calls = 0
+        self.classifiers = SimpleNamespace(moderate_chat=self.moderate_chat)
+
+    def moderate_chat(self, model, inputs, **kwargs):
+        self.calls += 1
+        self.latency.sleep(self.settings.mistral_latency)
+        results = []
+        for _ in inputs:
+            categories = {name: False for name in CATEGORIES}
+            if self.latency.random() < self.settings.flag_rate:
+                categories[CATEGORIES[int(self.latency.random() * len(CATEGORIES))]] = True
+            results.append(SimpleNamespace(categories=categories))
+        return SimpleNamespace(results=results)
+
+
+# ---------- Ollama ----------
+
+class FakeChatModel:
+    """invoke / ainvoke / stream returning message-like objects with .content"""
+
+    ANSWER = "This is a simulated answer with a handful of words in it. It ends here."
+
+    def __init__(self, settings, latency=None):
+        self.settings = settings
+        self.latency = latency or _Latency(settings)
+        self.calls = 0
+
+    def _content(self, prompt):
+        prompt = str(prompt)
+        if '"answers"' in prompt:
+            match = re.search(r"Provide (\d+)", prompt)
+            n = int(match.group(1)) if match else 10
+            return json.dumps({"answers": [{"style": "fake", "answer": self.ANSWER} for _ in range(n)]})
+        return self.ANSWER
+
+    def invoke(self, prompt, *args, **kwargs):
+        self.calls += 1
+        self.latency.sleep(self.settings.llm_latency)
+        return SimpleNamespace(content=self._content(prompt))
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency.delay(self.settings.llm_latency))
+        return SimpleNamespace(content=self._content(prompt))
+
+    def stream(self, prompt, *args, **kwargs):
+        self.calls += 1
+        for word in self._content(prompt).split(" "):
+            time.sleep(self.latency.delay(self.settings.token_latency))
+            yield SimpleNamespace(content=word + " ")
+
+
+class _FakeCombineDocumentsChain:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def invoke(self, inputs, *args, **kwargs):
+        return {"output_text": self.llm.invoke(inputs["question"]).content}
+
+    async def ainvoke(self, inputs, *args, **kwargs):
+        return {"output_text": (await self.llm.ainvoke(inputs["question"])).content}
+
+
+class FakeQAChain:
+    """Stands in for RetrievalQA: retrieval, then one generation."""
+
+    def __init__(self, llm, retriever):
+        self.retriever = retriever
+        self.combine_documents_chain = _FakeCombineDocumentsChain(llm)
+
+    def invoke(self, inputs, *args, **kwargs):
+        docs = self.retriever.invoke(inputs["question"])
+        output = self.combine_documents_chain.invoke({"input_documents": docs, "question": inputs["question"]})
+        return {"question": inputs["question"], "result": output["output_text"]}
+
+
+# ---------- Chroma / embeddings ----------
+
+class FakeRetriever:
+    def __init__(self, settings, latency=None, k=4):
+        self.settings = settings
+        self.latency = latency or _Latency(settings)
+        self.k = k
+
+    def invoke(self, query, *args, **kwargs):
+        self.latency.sleep(self.settings.retrieval_latency)
+        return [SimpleNamespace(page_content=f"Document {i} about {query}", metadata={}) for i in range(self.k)]
+
+
+class FakeEmbeddings:
+    """Deterministic pseudo-embeddings: the same text always maps to the same unit vector."""
+
+    def __init__(self, settings, latency=None, dim=384):
+        self.settings = settings
+        self.latency = latency or _Latency(settings)
+        self.dim = dim
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0, 1) for _ in range(self.dim)]
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector]
+
+    def embed_query(self, text):
+        self.latency.sleep(self.settings.embedding_latency)
+        return self._vector(text)
+
+    def embed_documents(self, texts):
+        self.latency.sleep(self.settings.embedding_latency)
+        return [self._vector(text) for text in texts]
@@ -16,3 +16,131 @@ DATABASE_PATH = DATA_DIR / "database.db"
 
 # ---- MODEL CONFIG ----
 MODERATION_MODEL = "mistral-moderation-latest"
+GROQ_MODERATION_MODEL = "openai/gpt-oss-safeguard-20b"
+
+# ---- GENERATION CONFIG ----
+# Max number of parallel ChatOllama calls in generate_multiple_answers (1 = sequential)
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "4"))
+
+# ---- MODERATION VERDICT CACHE ----
+# In-process LRU size, SQLite row cap and time-to-live (seconds) of cached Groq verdicts
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "1024"))
+VERDICT_CACHE_MAX_ROWS = int(os.getenv("VERDICT_CACHE_MAX_ROWS", "100000"))
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", str(7 * 24 * 3600)))
+
+# ---- JSONL LOGS ----
+# Append-only logs of moderation results and generated answers
+OUTPUT_LOG_PATH = DATA_DIR / "output.jsonl"
+ANSWERS_LOG_PATH = DATA_DIR / "answers_log.jsonl"
+JSONL_BUFFER_SIZE = int(os.getenv("JSONL_BUFFER_SIZE", "64"))       # records kept before a flush
+JSONL_FLUSH_INTERVAL = float(os.getenv("JSONL_FLUSH_INTERVAL", "5"))  # seconds between flushes
+JSONL_FSYNC = os.getenv("JSONL_FSYNC", "1") == "1"
+JSONL_MAX_BYTES = int(os.getenv("JSONL_MAX_BYTES", str(50 * 1024 * 1024)))  # rotate above this size
+JSONL_BACKUPS = int(os.getenv("JSONL_BACKUPS", "5"))
+
+# ---- LOCAL PRE-CLASSIFIER ----
+# Resolves clear-cut prompts on-box before the Groq call (see src/preclassifier.py)
+PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "1") == "1"
+# The embedding allow stage costs one embed_query per non-escalated prompt: off unless opted in
+PRECLASSIFIER_EMBEDDINGS = os.getenv("PRECLASSIFIER_EMBEDDINGS", "0") == "1"
+# Allowing a prompt locally skips the policy check, so only near paraphrases of a benign seed qualify.
+# Starting points only: measure the allow rate on real traffic with benchmarks/bench_preclassifier.py
+# and set these from it before turning PRECLASSIFIER_EMBEDDINGS on
+PRECLASSIFIER_BENIGN_THRESHOLD = float(os.getenv("PRECLASSIFIER_BENIGN_THRESHOLD", "0.9"))  # min cosine to a benign seed
+PRECLASSIFIER_MARGIN = float(os.getenv("PRECLASSIFIER_MARGIN", "0.3"))  # benign minus harmful similarity
+
+# ---- SEMANTIC ANSWER CACHE (RAG mode) ----
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # min cosine similarity for a hit
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+
+# ---- STARTUP ----
+# Load the embedding model in a background thread as soon as the REPL starts
+WARMUP_EMBEDDINGS = os.getenv("WARMUP_EMBEDDINGS", "1") == "1"
+
+# ---- BENCHMARKS ----
+# Every benchmark run appends its results here (see benchmarks/common.py)
+BENCHMARK_LOG_PATH = DATA_DIR / "benchmarks.jsonl"
+
+# ---- INGESTION (python -m src.ingest) ----
+INGEST_SOURCE_DIR = DATA_DIR / "documents"
+INGEST_MANIFEST_PATH = DATA_DIR / "ingest_manifest.json"
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))  # chunks per embedding call
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "150"))
+
+# ---- SPECULATIVE EXECUTION ----
+# Start retrieval (and optionally generation) while the Groq verdict is pending
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "1") == "1"
+SPECULATIVE_GENERATION = os.getenv("SPECULATIVE_GENERATION", "0") == "1"
+
+# ---- STREAMING GENERATION ----
+# Stream answers, moderating them as they are generated (see src/streaming.py)
+STREAMING_MODE = os.getenv("STREAMING_MODE", "0") == "1"
+STREAM_CHECK_MIN_CHARS = int(os.getenv("STREAM_CHECK_MIN_CHARS", "200"))  # new chars before a moderation check
+STREAM_CHECK_OVERLAP = int(os.getenv("STREAM_CHECK_OVERLAP", "200"))  # already checked chars sent again for context
+STREAM_BATCH_WINDOW_MS = float(os.getenv("STREAM_BATCH_WINDOW_MS", "100"))  # checks of concurrent streams batched together
+# Abort on any of these categories; health / financial / law alone only count towards STREAM_MAX_RISK
+STREAM_ABORT_CATEGORIES = tuple(os.getenv(
+    "STREAM_ABORT_CATEGORIES",
+    "sexual,hate_and_discrimination,violence_and_threats,dangerous_and_criminal_content,selfharm",
+).split(","))
+STREAM_MAX_RISK = int(os.getenv("STREAM_MAX_RISK", "2"))  # abort once risk_score exceeds this
+
+# General-chat generation: "per_answer" (one call per answer) or "single_call" (one structured call)
+GENERATION_STRATEGY = os.getenv("GENERATION_STRATEGY", "per_answer")
+
+# ---- METRICS ----
+# Per-stage timings, buffered in memory and written to the metrics table in batches
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_FLUSH_SIZE = int(os.getenv("METRICS_FLUSH_SIZE", "256"))          # queued measurements that trigger a flush
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))  # seconds between background flushes
+
+# ---- MODERATION SERVICE (python -m src.moderation_service) ----
+# When set, classify_texts() sends its batches to this service instead of calling Mistral
+MODERATION_SERVICE_URL = os.getenv("MODERATION_SERVICE_URL", "")
+MODERATION_SERVICE_HOST = os.getenv("MODERATION_SERVICE_HOST", "127.0.0.1")
+MODERATION_SERVICE_PORT = int(os.getenv("MODERATION_SERVICE_PORT", "8100"))
+MODERATION_BATCH_SIZE = int(os.getenv("MODERATION_BATCH_SIZE", "32"))            # max texts per Mistral call
+MODERATION_BATCH_WINDOW_MS = float(os.getenv("MODERATION_BATCH_WINDOW_MS", "20"))  # wait for more texts this long
+MODERATION_MAX_INFLIGHT = int(os.getenv("MODERATION_MAX_INFLIGHT", "4"))          # concurrent Mistral calls
+
+# ---- BULK MODERATION (python -m src.bulk_moderate) ----
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "8"))   # Groq / Mistral calls in flight
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "256"))   # records per transaction / checkpoint
+
+# ---- API CLIENTS (src/clients.py) ----
+# Client-side rate limits sized to the provider quotas (requests per minute, 0 = no limit)
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_BURST = float(os.getenv("GROQ_BURST", "5"))
+MISTRAL_RPM = float(os.getenv("MISTRAL_RPM", "60"))
+MISTRAL_BURST = float(os.getenv("MISTRAL_BURST", "5"))
+# Retries of 429 / 5xx / connection errors, with exponential backoff and jitter
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+
+# ---- RETRIEVAL (src/retrieval.py) ----
+RETRIEVAL_SEARCH_TYPE = os.getenv("RETRIEVAL_SEARCH_TYPE", "similarity")     # "similarity" or "mmr"
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))                              # documents passed to the LLM
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))                 # MMR candidates
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.5"))        # 1 = relevance only, 0 = diversity only
+RETRIEVAL_SCORE_THRESHOLD = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", "0"))  # min relevance (0-1), 0 = off
+RETRIEVAL_HNSW_EF = int(os.getenv("RETRIEVAL_HNSW_EF", "0"))                  # HNSW ef_search, 0 = keep the store's
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))          # cached results, 0 = off
+
+# ---- EMBEDDINGS ----
+# "huggingface" (sentence-transformers on PyTorch) or "onnx" (int8 ONNX model, see src/onnx_embeddings.py)
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "huggingface")
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", DATA_DIR / "onnx" / "all-MiniLM-L6-v2"))
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "1") == "1"
+EMBEDDINGS_BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "32"))
+EMBEDDINGS_THREADS = int(os.getenv("EMBEDDINGS_THREADS", "0"))  # onnxruntime intra-op threads, 0 = all cores
+
+# ---- GROQ STREAMING ----
+# Decide on the streamed "violation" field; rationale and DB writes finish in the background
+GROQ_STREAMING = os.getenv("GROQ_STREAMING", "0") == "1"
+
+# ---- GROQ BATCH CLASSIFICATION ----
+# Prompts per Groq request in batch classification (classify_prompts, bulk moderation)
+GROQ_BATCH_SIZE = int(os.getenv("GROQ_BATCH_SIZE", "16"))
@@ -1,47 +1,289 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
 from config import DATABASE_PATH
+from db.metrics import timed
 from tabulate import tabulate
-import os
+
+# Applied to every connection. WAL lets readers run alongside the writer and
+# synchronous=NORMAL only fsyncs at checkpoints, which is safe in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+
+_local = threading.local()
+# SQLite allows a single writer: serialize our own writers instead of
+# letting them spin on SQLITE_BUSY
+_write_lock = threading.RLock()
+_open_connections = []
+_open_connections_lock = threading.Lock()
+
 
 def get_connection():
-    """Create and return a SQLite connection."""
-    return sqlite3.connect(DATABASE_PATH)
+    """Create and return a new, configured SQLite connection."""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=5.0)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def shared_connection():
+    """
+    Return this thread's long-lived connection, opened on first use.
+
+    sqlite3 connections must not be shared across threads, so the pool
+    holds one connection per (thread, database path).
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    path = str(DATABASE_PATH)
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = get_connection()
+        with _open_connections_lock:
+            _open_connections.append(conn)
+    return conn
 
 
+@contextmanager
+def transaction():
+    """Run a block of writes on the shared connection as one committed transaction."""
+    conn = shared_connection()
+    with _write_lock:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def close_connections():
+    """Close every pooled connection (e.g. at shutdown or between tests)."""
+    with _open_connections_lock:
+        for conn in _open_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _open_connections.clear()
+    _local.__dict__.pop("connections", None)
+
+
+# (database path, schema name) pairs already ensured by ensure_schema
+_schema_ready = set()
+
+
+def ensure_schema(name: str, *steps, conn=None):
+    """
+    Run the schema `steps` named `name` once per database.
+
+    Each step is an idempotent SQL statement (CREATE ... IF NOT EXISTS) or a
+    callable taking the connection. db/init_db.py creates everything up
+    front; this keeps databases initialized before a table existed working.
+    Pass `conn` when already inside transaction(), otherwise a transaction
+    of its own is opened.
+    """
+    key = (str(DATABASE_PATH), name)
+    if key in _schema_ready:
+        return
+    if conn is None:
+        with transaction() as conn:
+            _run_steps(key, steps, conn)
+    else:
+        _run_steps(key, steps, conn)
+
+
+def _run_steps(key, steps, conn):
+    # Always called with _write_lock held (inside transaction()), so a
+    # schema is never migrated twice concurrently
+    if key in _schema_ready:
+        return
+    for step in steps:
+        if callable(step):
+            step(conn)
+        else:
+            conn.execute(step)
+    _schema_ready.add(key)
+
+
+def _rollups(conn):
+    """db.rollups, with its table ready on this database (imported lazily: it imports this module)."""
+    from db import rollups
+    ensure_schema("moderation_rollups", rollups.CREATE_SQL, conn=conn)
+    return rollups
+
+
+@timed("db.save_prompt")
 def save_prompt(prompt: str):
     """
     Save a new prompt into the database.
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with transaction() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO moderation_results (prompt)
+            VALUES (?)
+            """,
+            (prompt,),
+        )
+        return cur.lastrowid
 
-    # 1) Trouver une ligne vide pour le prompt
-    cur.execute(
-        """
-        INSERT INTO moderation_results (prompt)
-        VALUES (?)
-        """,
-        (prompt,),
-    )
 
-    inserted_id = cur.lastrowid
-    conn.commit()
-    conn.close()
-    return inserted_id
+@timed("db.save_prompts")
+def save_prompts(prompt: str, count: int = 10):
+    """
+    Reserve `count` empty rows for a prompt in a single transaction.
+
+    Returns the ids of the inserted rows.
+    """
+
+    with transaction() as conn:
+        conn.executemany(
+            """
+            INSERT INTO moderation_results (prompt)
+            VALUES (?)
+            """,
+            [(prompt,)] * count,
+        )
+        # We hold the only write transaction, so the AUTOINCREMENT ids are contiguous
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - count + 1, last_id + 1))
+
 
+# Category flag columns; bit i of the `flags` column is FLAG_COLUMNS[i]
+FLAG_COLUMNS = (
+    "sexual",
+    "hate_and_discrimination",
+    "violence_and_threats",
+    "dangerous_and_criminal_content",
+    "selfharm",
+    "health",
+    "financial",
+    "law",
+    "pii",
+)
+FLAG_BITS = {name: 1 << i for i, name in enumerate(FLAG_COLUMNS)}
 
+ANALYSIS_COLUMNS = ("answer", *FLAG_COLUMNS, "risk_score", "flags")
+
+
+def flags_bitmask(record: dict) -> int:
+    """Pack the category booleans of `record` into the `flags` bitmask."""
+    return sum(bit for name, bit in FLAG_BITS.items() if record.get(name))
+
+
+def decode_flags(flags: int):
+    """Category names set in a `flags` bitmask."""
+    return [name for name, bit in FLAG_BITS.items() if flags & bit]
+
+
+_UPDATE_ANALYSIS_SQL = f"""
+    UPDATE moderation_results
+    SET {", ".join(f"{column} = ?" for column in ANALYSIS_COLUMNS)}
+    WHERE id = ?
+"""
+
+
+_FLAGS_BACKFILL_SQL = f"""
+    UPDATE moderation_results
+    SET flags = {" | ".join(f"(COALESCE({name}, 0) << {i})" for i, name in enumerate(FLAG_COLUMNS))}
+    WHERE flags IS NULL AND risk_score IS NOT NULL
+"""
+_FLAGS_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_moderation_results_flags
+    ON moderation_results (flags, risk_score, created_at)
+"""
+def migrate_flags(conn):
+    """Add the `flags` column if missing, backfill it from the category columns and index it."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(moderation_results)")]
+    if not columns:
+        raise sqlite3.OperationalError(
+            "Table moderation_results not found. Please run `python -m db.init_db` first."
+        )
+    if "flags" not in columns:
+        conn.execute("ALTER TABLE moderation_results ADD COLUMN flags INTEGER")
+    conn.execute(_FLAGS_BACKFILL_SQL)
+    # Covering index for "category X over a period" lookups and counts
+    conn.execute(_FLAGS_INDEX_SQL)
+
+
+def ensure_flags():
+    """Run migrate_flags once per database, so databases created before `flags` existed keep working."""
+    ensure_schema("flags", migrate_flags)
+
+
+def _analysis_values(record: dict):
+    """Normalize values from `record` into the ANALYSIS_COLUMNS order."""
+    return (
+        record.get("answer"),
+        *(int(record.get(name, False)) for name in FLAG_COLUMNS),
+        record.get("risk_score", 0),
+        flags_bitmask(record),
+    )
+
+
+@timed("db.save_analysis")
 def save_analysis(record: dict):
     """
     Save moderation analysis result into the database.
+
+    If `record` carries an "id" (as returned by save_prompts) that row is
+    updated directly; otherwise the next empty row is looked up.
     """
 
-    conn = get_connection()
+    ensure_flags()
+    with transaction() as conn:
+        if record.get("id") is not None:
+            conn.execute(_UPDATE_ANALYSIS_SQL, (*_analysis_values(record), record["id"]))
+            row_id = record["id"]
+        else:
+            row_id = _fill_next_empty_row(conn, record)
+        _rollups(conn).add_results(conn, [row_id])
+
+
+@timed("db.save_analyses")
+def save_analyses(records):
+    """
+    Save a whole batch of moderation results in a single transaction.
+
+    Records with an "id" are written with one executemany; the others fall
+    back to the empty-row lookup.
+    """
+
+    with_id = [(*_analysis_values(r), r["id"]) for r in records if r.get("id") is not None]
+    without_id = [r for r in records if r.get("id") is None]
+
+    ensure_flags()
+    with transaction() as conn:
+        if with_id:
+            conn.executemany(_UPDATE_ANALYSIS_SQL, with_id)
+        row_ids = [values[-1] for values in with_id]
+        for record in without_id:
+            row_ids.append(_fill_next_empty_row(conn, record))
+        _rollups(conn).add_results(conn, row_ids)
+
+
+def _fill_next_empty_row(conn, record: dict):
+    """
+    Legacy path: find the next empty row and fill it.
+
+    Served by the partial indexes on unfilled rows created in db/init_db.py.
+    """
     cur = conn.cursor()
 
-    # 1) Find the next empty row (any prompt)
+    # 1) Find the next empty row, restricted to the record's prompt when known
+    prompt_filter = "AND prompt = ?" if record.get("prompt") is not None else ""
+    params = (record["prompt"],) if prompt_filter else ()
     cur.execute(
-        """
+        f"""
         SELECT id, prompt
         FROM moderation_results
         WHERE (answer IS NULL OR answer = '')
@@ -55,75 +297,29 @@ def save_analysis(record: dict):
           AND law IS NULL
           AND pii IS NULL
           AND risk_score IS NULL
+          {prompt_filter}
         ORDER BY id
         LIMIT 1
-        """
+        """,
+        params,
     )
 
     row = cur.fetchone()
 
     if not row:
-        conn.close()
         # You can log instead if you don't want an exception
         raise ValueError("No empty moderation_results row left to fill.")
 
     empty_id, prompt = row  # prompt is there if you want to log it
 
-    # 2) Normalize values from `record`
-    answer = record.get("answer")
-    sexual = int(record.get("sexual", False))
-    hate_and_discrimination = int(record.get("hate_and_discrimination", False))
-    violence_and_threats = int(record.get("violence_and_threats", False))
-    dangerous_and_criminal_content = int(record.get("dangerous_and_criminal_content", False))
-    selfharm = int(record.get("selfharm", False))
-    health = int(record.get("health", False))
-    financial = int(record.get("financial", False))
-    law = int(record.get("law", False))
-    pii = int(record.get("pii", False))
-    risk_score = record.get("risk_score", 0)
-
-    # 3) Update that specific row
-    cur.execute(
-        """
-        UPDATE moderation_results
-        SET
-            answer = ?,
-            sexual = ?,
-            hate_and_discrimination = ?,
-            violence_and_threats = ?,
-            dangerous_and_criminal_content = ?,
-            selfharm = ?,
-            health = ?,
-            financial = ?,
-            law = ?,
-            pii = ?,
-            risk_score = ?
-        WHERE id = ?
-        """,
-        (
-            answer,
-            sexual,
-            hate_and_discrimination,
-            violence_and_threats,
-            dangerous_and_criminal_content,
-            selfharm,
-            health,
-            financial,
-            law,
-            pii,
-            risk_score,
-            empty_id,
-        ),
-    )
-
-    conn.commit()
-    conn.close()
+    # 2) Update that specific row
+    cur.execute(_UPDATE_ANALYSIS_SQL, (*_analysis_values(record), empty_id))
+    return empty_id
 
 
 def fetch_all():
     """Fetch all rows from the moderation_results table."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cur = conn.cursor()
+    cur = shared_connection().cursor()
     cur.execute("SELECT id, prompt, answer, sexual, hate_and_discrimination, violence_and_threats, dangerous_and_criminal_content, selfharm, health, financial, law, pii, risk_score, created_at FROM moderation_results;")
     rows = cur.fetchall()
 
@@ -132,23 +328,260 @@ def fetch_all():
                     "risk_score", "created_at"]
     return tabulate(rows, headers=headers, tablefmt="grid")
 
+def _window(since, until):
+    """SQL condition and params on created_at; bounds are datetimes or 'YYYY-MM-DD HH:MM:SS' (UTC)."""
+    clauses, params = [], []
+    for op, bound in ((">=", since), ("<", until)):
+        if bound is not None:
+            if hasattr(bound, "strftime"):
+                bound = bound.strftime("%Y-%m-%d %H:%M:%S")
+            clauses.append(f"created_at {op} ?")
+            params.append(bound)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+def _category_values(category: str):
+    """Every `flags` bitmask value that contains `category`."""
+    bit = FLAG_BITS[category]
+    return [flags for flags in range(1 << len(FLAG_COLUMNS)) if flags & bit]
+
+
+def fetch_flagged(category: str, since=None, until=None, limit: int = 100):
+    """
+    Answers flagged with `category` in a time window, newest first:
+    (id, prompt, answer, flags, risk_score, created_at) rows.
+
+    The bitmask values containing the category are enumerated so the lookup
+    is an index search on (flags, risk_score, created_at), not a table scan.
+    """
+    ensure_flags()
+    values = _category_values(category)
+    window, params = _window(since, until)
+    cur = shared_connection().execute(
+        f"""
+        SELECT id, prompt, answer, flags, risk_score, created_at
+        FROM moderation_results
+        WHERE flags IN ({", ".join("?" for _ in values)}){window}
+        ORDER BY created_at DESC
+        LIMIT ?
+        """,
+        (*values, *params, limit),
+    )
+    return cur.fetchall()
+
+
+def count_by_category(since=None, until=None):
+    """Number of flagged answers per category in a time window ({category: count})."""
+    ensure_flags()
+    window, params = _window(since, until)
+    # Grouped on the index: at most one row per distinct bitmask
+    cur = shared_connection().execute(
+        f"SELECT flags, COUNT(*) FROM moderation_results WHERE flags > 0{window} GROUP BY flags",
+        params,
+    )
+    counts = dict.fromkeys(FLAG_COLUMNS, 0)
+    for flags, count in cur:
+        for name in decode_flags(flags):
+            counts[name] += count
+    return counts
+
+
+@timed("db.save_rejected_prompt")
 def save_rejected_prompt(prompt: str, reason: str = None):
-    print(os.curdir)
-    conn = sqlite3.connect("data/database.db")
-    cur = conn.cursor()
+    with transaction() as conn:
+        cur = conn.execute("""
+            INSERT INTO rejected_prompts (prompt, reason)
+            VALUES (?, ?)
+        """, (prompt, reason))
+        _rollups(conn).add_rejected(conn, cur.lastrowid, cur.lastrowid)
+
+
+@timed("db.save_rejected_prompts")
+def save_rejected_prompts(rows):
+    """Save many (prompt, reason) pairs in a single transaction."""
+    rows = list(rows)
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO rejected_prompts (prompt, reason)
+            VALUES (?, ?)
+        """, rows)
+        _add_rejected_rollups(conn, len(rows))
+
+
+def _add_rejected_rollups(conn, count):
+    # The ids of the rows just inserted are contiguous: we hold the only write transaction
+    if count:
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        _rollups(conn).add_rejected(conn, last_id - count + 1, last_id)
+
+_INSERT_ANALYSIS_SQL = f"""
+    INSERT INTO moderation_results (prompt, {", ".join(ANALYSIS_COLUMNS)})
+    VALUES (?, {", ".join("?" for _ in ANALYSIS_COLUMNS)})
+"""
+
+
+CREATE_BULK_JOBS_SQL = """
+    CREATE TABLE IF NOT EXISTS bulk_jobs (
+        job_id TEXT PRIMARY KEY,
+        source TEXT,
+        position INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+# Groq verdict cache, the SQLite tier of src/verdict_cache.py
+CREATE_MODERATION_CACHE_SQL = """
+    CREATE TABLE IF NOT EXISTS moderation_cache (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        policy_hash TEXT NOT NULL,
+        result TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_hit_at REAL NOT NULL
+    )
+"""
+CREATE_MODERATION_CACHE_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_moderation_cache_last_hit
+    ON moderation_cache (last_hit_at)
+"""
+
+
+def load_bulk_checkpoint(job_id: str) -> int:
+    """Number of input records already processed by a bulk moderation job (0 if new)."""
+    ensure_schema("bulk_jobs", CREATE_BULK_JOBS_SQL)
+    with transaction() as conn:
+        row = conn.execute("SELECT position FROM bulk_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return row[0] if row else 0
+
 
-    cur.execute("""
-        INSERT INTO rejected_prompts (prompt, reason)
-        VALUES (?, ?)
-    """, (prompt, reason))
+@timed("db.save_bulk_batch")
+def save_bulk_batch(job_id: str, source: str, position: int, rejected=(), analyses=()):
+    """
+    Write one chunk of bulk moderation results and advance the job's
+    checkpoint, all in the same transaction: after a crash the job resumes
+    exactly after the last committed chunk.
+
+    `rejected` holds (prompt, reason) pairs; `analyses` holds records like
+    save_analysis, inserted as new moderation_results rows.
+    """
+    ensure_flags()
+    ensure_schema("bulk_jobs", CREATE_BULK_JOBS_SQL)
+    with transaction() as conn:
+        if rejected:
+            conn.executemany("INSERT INTO rejected_prompts (prompt, reason) VALUES (?, ?)", rejected)
+            _add_rejected_rollups(conn, len(rejected))
+        if analyses:
+            conn.executemany(_INSERT_ANALYSIS_SQL, [(r.get("prompt"), *_analysis_values(r)) for r in analyses])
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            _rollups(conn).add_results(conn, range(last_id - len(analyses) + 1, last_id + 1))
+        conn.execute(
+            """
+            INSERT INTO bulk_jobs (job_id, source, position, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(job_id) DO UPDATE SET
+                position = excluded.position,
+                updated_at = excluded.updated_at
+            """,
+            (job_id, source, position),
+        )
+
+RESULT_COLUMNS = ("id", "prompt", "answer", *FLAG_COLUMNS, "risk_score", "created_at")
+REJECTED_COLUMNS = ("id", "prompt", "reason", "created_at")
+
+
+def _filters(since=None, until=None, min_risk=None, category=None):
+    window, params = _window(since, until)
+    if min_risk is not None:
+        window += " AND risk_score >= ?"
+        params.append(min_risk)
+    if category is not None:
+        ensure_flags()
+        values = _category_values(category)
+        window += f" AND flags IN ({', '.join('?' for _ in values)})"
+        params.extend(values)
+    return window, params
+
+
+def _fetch_page(table, columns, after_id, limit, offset, window, params):
+    cur = shared_connection().execute(
+        f"""
+        SELECT {", ".join(columns)} FROM {table}
+        WHERE id > ?{window}
+        ORDER BY id
+        LIMIT ? OFFSET ?
+        """,
+        (after_id, *params, limit, offset),
+    )
+    return cur.fetchall()
+
+
+def fetch_results_page(after_id: int = 0, limit: int = 50, offset: int = 0, **filters):
+    """
+    One page of moderation_results (RESULT_COLUMNS), ordered by id.
+
+    Pass the last id of a page as `after_id` to get the next one (keyset
+    pagination: every page costs the same). Filters: since / until
+    (created_at), min_risk, category.
+    """
+    window, params = _filters(**filters)
+    return _fetch_page("moderation_results", RESULT_COLUMNS, after_id, limit, offset, window, params)
+
+
+def fetch_rejected_page(after_id: int = 0, limit: int = 50, offset: int = 0, since=None, until=None):
+    """One page of rejected_prompts (REJECTED_COLUMNS), like fetch_results_page."""
+    window, params = _window(since, until)
+    return _fetch_page("rejected_prompts", REJECTED_COLUMNS, after_id, limit, offset, window, params)
+
+
+def _iter_pages(fetch_page, page_size, **filters):
+    after_id = 0
+    while True:
+        rows = fetch_page(after_id=after_id, limit=page_size, **filters)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after_id = rows[-1][0]
+
+
+def iter_results(page_size: int = 1000, **filters):
+    """Stream every matching moderation_results row, one page in memory at a time."""
+    return _iter_pages(fetch_results_page, page_size, **filters)
+
+
+def iter_rejected(page_size: int = 1000, **filters):
+    """Stream every matching rejected_prompts row, one page in memory at a time."""
+    return _iter_pages(fetch_rejected_page, page_size, **filters)
+
+
+def export_rows(rows, columns, path):
+    """
+    Write rows to a .csv or .jsonl file as they are produced (bounded memory).
+
+    Returns the number of rows written.
+    """
+    import csv
+    import json
+    from pathlib import Path
+
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() == ".csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+                count += 1
+    return count
 
-    conn.commit()
-    conn.close()
 
 def fetch_all_rejected():
-    """Fetch all rows from the moderation_results table."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cur = conn.cursor()
+    """Fetch all rows from the rejected_prompts table."""
+    cur = shared_connection().cursor()
     cur.execute("SELECT id, prompt, reason, created_at FROM rejected_prompts ;")
     rows = cur.fetchall()
 
@@ -1,6 +1,13 @@
 import sqlite3
 import os
 from config import DATABASE_PATH, DATA_DIR
+from db.database import (
+    CREATE_BULK_JOBS_SQL,
+    CREATE_MODERATION_CACHE_INDEX_SQL,
+    CREATE_MODERATION_CACHE_SQL,
+    migrate_flags,
+)
+from db import metrics, rollups
 
 
 def init_database():
@@ -8,6 +15,8 @@ def init_database():
     os.makedirs(DATA_DIR, exist_ok=True)
 
     connection = sqlite3.connect(DATABASE_PATH)
+    # WAL est persistant : une fois activé, il s'applique à toutes les connexions
+    connection.execute("PRAGMA journal_mode=WAL")
     cursor = connection.cursor()
 
     # Exemple de table (tu peux l’adapter)
@@ -27,10 +36,29 @@ def init_database():
             law INTEGER,
             pii INTEGER,
             risk_score INTEGER,
+            flags INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
           
+    # Index partiels sur les lignes pas encore remplies : la recherche de
+    # "la prochaine ligne vide" dans save_analysis ne scanne plus toute la table
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_moderation_results_unfilled
+        ON moderation_results (id)
+        WHERE risk_score IS NULL;
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_moderation_results_unfilled_prompt
+        ON moderation_results (prompt, id)
+        WHERE risk_score IS NULL;
+    """)
+
+    # Masque de bits des catégories (bit i = FLAG_COLUMNS[i] dans db/database.py),
+    # calculé à l'écriture ; les lignes existantes sont migrées ici
+    # (database.ensure_flags fait la même chose au premier usage)
+    migrate_flags(cursor)
+
     # Nouvelle table : rejected_prompts
 
     cursor.execute("""
@@ -42,6 +70,21 @@ def init_database():
         );
     """)
 
+    # Cache des verdicts Groq (voir src/verdict_cache.py)
+    cursor.execute(CREATE_MODERATION_CACHE_SQL)
+    cursor.execute(CREATE_MODERATION_CACHE_INDEX_SQL)
+
+    # Mesures de latence par étape (voir db/metrics.py et db/show_metrics.py)
+    cursor.execute(metrics.CREATE_SQL)
+    cursor.execute(metrics.CREATE_INDEX_SQL)
+
+    # Statistiques agrégées par heure et par jour (voir db/rollups.py),
+    # mises à jour dans la même transaction que les écritures
+    cursor.execute(rollups.CREATE_SQL)
+
+    # Reprise des traitements en masse (voir src/bulk_moderate.py)
+    cursor.execute(CREATE_BULK_JOBS_SQL)
+
     connection.commit()
     connection.close()
     print("Database initialized successfully !")
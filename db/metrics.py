@@ -0,0 +1,177 @@
+import atexit
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import METRICS_ENABLED, METRICS_FLUSH_INTERVAL, METRICS_FLUSH_SIZE
+
+# db.database imports this module to instrument its writers, so it is only
+# imported inside the functions that need it
+
+# (stage, duration_ms, ok, created_at) tuples waiting to be written.
+# deque.append is atomic, so recording needs no lock.
+_pending = deque()
+_wake = threading.Event()
+_flush_lock = threading.Lock()
+_flusher = None
+
+CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        stage TEXT NOT NULL,
+        duration_ms REAL NOT NULL,
+        ok INTEGER NOT NULL DEFAULT 1,
+        created_at REAL NOT NULL
+    )
+"""
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_metrics_stage_created ON metrics (stage, created_at)"
+
+
+def record(stage: str, duration_ms: float, ok: bool = True):
+    """Queue one measurement; a background thread writes it to the metrics table."""
+    if not METRICS_ENABLED:
+        return
+    _pending.append((stage, duration_ms, int(ok), time.time()))
+    if _flusher is None:
+        _start_flusher()
+    if len(_pending) >= METRICS_FLUSH_SIZE and not _wake.is_set():
+        _wake.set()
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block: `with span("rag_retrieval"): ...`"""
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record(stage, (time.perf_counter() - start) * 1000, ok)
+
+
+def timed(stage: str):
+    """Decorator version of span(), for plain and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                ok = False
+                try:
+                    result = await func(*args, **kwargs)
+                    ok = True
+                    return result
+                finally:
+                    record(stage, (time.perf_counter() - start) * 1000, ok)
+            return async_wrapper
+
+        # Written out instead of using span(): a generator-based context
+        # manager costs several microseconds per call
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                record(stage, (time.perf_counter() - start) * 1000, ok)
+        return wrapper
+    return decorator
+
+
+def flush():
+    """Write every queued measurement in a single transaction."""
+    with _flush_lock:
+        rows = []
+        while _pending:
+            rows.append(_pending.popleft())
+        if not rows:
+            return 0
+        from db.database import ensure_schema, transaction
+        ensure_schema("metrics", CREATE_SQL, CREATE_INDEX_SQL)
+        with transaction() as conn:
+            conn.executemany(
+                "INSERT INTO metrics (stage, duration_ms, ok, created_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(METRICS_FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush()
+        except Exception as e:
+            print("⚠️ Could not write metrics:", e)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception as e:
+        print("⚠️ Could not write metrics:", e)
+
+
+def _start_flusher():
+    global _flusher
+    with _flush_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True)
+            _flusher.start()
+            atexit.register(_flush_at_exit)
+
+
+def _percentile(ordered, p):
+    index = max(0, min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1))
+    return ordered[index]
+
+
+def stage_percentiles(since: float = None):
+    """
+    Latency summary per stage: (stage, count, errors, p50, p95, p99, max) in ms.
+
+    `since` is a unix timestamp; older measurements are ignored.
+    """
+    from db.database import ensure_schema, shared_connection
+    ensure_schema("metrics", CREATE_SQL, CREATE_INDEX_SQL)
+    cur = shared_connection().execute(
+        """
+        SELECT stage, duration_ms, ok FROM metrics
+        WHERE created_at >= ?
+        ORDER BY stage, duration_ms
+        """,
+        (since or 0,),
+    )
+
+    rows = []
+    stage, durations, errors = None, [], 0
+    for row_stage, duration_ms, ok in cur:
+        if row_stage != stage and durations:
+            rows.append(_summary(stage, durations, errors))
+            durations, errors = [], 0
+        stage = row_stage
+        durations.append(duration_ms)
+        errors += not ok
+    if durations:
+        rows.append(_summary(stage, durations, errors))
+    return rows
+
+
+def _summary(stage, durations, errors):
+    return (
+        stage,
+        len(durations),
+        errors,
+        _percentile(durations, 50),
+        _percentile(durations, 95),
+        _percentile(durations, 99),
+        durations[-1],
+    )
@@ -0,0 +1,142 @@
+"""
+Hourly and daily summary tables for moderation statistics.
+
+moderation_rollups holds one row per (granularity, bucket): analysed
+answers, rejected prompts, a count per category and a risk_score
+histogram. The write functions of db/database.py update it in the same
+transaction as the rows they insert, so reports read a few thousand
+rollup rows instead of scanning moderation_results / rejected_prompts.
+
+Usage:
+  python -m db.rollups [--granularity day] [--since 2025-01-01]   # report
+  python -m db.rollups --rebuild                                  # backfill from the raw tables
+"""
+import argparse
+
+from db import database
+from db.database import FLAG_COLUMNS
+
+# risk_score is the number of flagged categories: 0..9
+RISK_COLUMNS = tuple(f"risk_{score}" for score in range(len(FLAG_COLUMNS) + 1))
+COUNT_COLUMNS = ("analysed", "rejected", *FLAG_COLUMNS, *RISK_COLUMNS)
+
+GRANULARITIES = {
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d",
+}
+
+CREATE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS moderation_rollups (
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        {", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in COUNT_COLUMNS)},
+        PRIMARY KEY (granularity, bucket)
+    )
+"""
+
+_UPSERT = f"""
+    ON CONFLICT (granularity, bucket) DO UPDATE SET
+    {", ".join(f"{column} = {column} + excluded.{column}" for column in COUNT_COLUMNS)}
+"""
+
+def _results_select(fmt, where):
+    counts = ", ".join(
+        ["COUNT(*)", "0"]
+        + [f"COALESCE(SUM({column}), 0)" for column in FLAG_COLUMNS]
+        + [f"COALESCE(SUM(risk_score = {score}), 0)" for score in range(len(RISK_COLUMNS))]
+    )
+    return f"""
+        SELECT ?, strftime('{fmt}', created_at), {counts}
+        FROM moderation_results
+        WHERE created_at IS NOT NULL AND risk_score IS NOT NULL AND {where}
+        GROUP BY 2
+    """
+
+
+def _rejected_select(fmt, where):
+    counts = ", ".join(["0", "COUNT(*)"] + ["0"] * (len(FLAG_COLUMNS) + len(RISK_COLUMNS)))
+    return f"""
+        SELECT ?, strftime('{fmt}', created_at), {counts}
+        FROM rejected_prompts
+        WHERE created_at IS NOT NULL AND {where}
+        GROUP BY 2
+    """
+
+
+def _insert(conn, select, params):
+    for granularity, fmt in GRANULARITIES.items():
+        conn.execute(
+            f"INSERT INTO moderation_rollups (granularity, bucket, {', '.join(COUNT_COLUMNS)}) "
+            f"{select(fmt)} {_UPSERT}",
+            (granularity, *params),
+        )
+
+
+def add_results(conn, ids):
+    """Count freshly analysed moderation_results rows (call inside their transaction)."""
+    ids = list(ids)
+    if ids:
+        where = f"id IN ({', '.join('?' for _ in ids)})"
+        _insert(conn, lambda fmt: _results_select(fmt, where), ids)
+
+
+def add_rejected(conn, first_id, last_id):
+    """Count rejected_prompts rows first_id..last_id (call inside their transaction)."""
+    _insert(conn, lambda fmt: _rejected_select(fmt, "id BETWEEN ? AND ?"), (first_id, last_id))
+
+
+def rebuild(conn):
+    """Recompute every bucket from the raw tables."""
+    conn.execute("DELETE FROM moderation_rollups")
+    _insert(conn, lambda fmt: _results_select(fmt, "1"), ())
+    _insert(conn, lambda fmt: _rejected_select(fmt, "1"), ())
+
+
+def fetch_rollups(granularity="hour", since=None, until=None):
+    """(bucket, *COUNT_COLUMNS) rows in a bucket range, oldest first."""
+    database.ensure_schema("moderation_rollups", CREATE_SQL)
+    conn = database.shared_connection()
+    clauses, params = ["granularity = ?"], [granularity]
+    if since is not None:
+        clauses.append("bucket >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("bucket < ?")
+        params.append(until)
+    cur = conn.execute(
+        f"SELECT bucket, {', '.join(COUNT_COLUMNS)} FROM moderation_rollups "
+        f"WHERE {' AND '.join(clauses)} ORDER BY bucket",
+        params,
+    )
+    return cur.fetchall()
+
+
+def main():
+    from tabulate import tabulate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--granularity", choices=GRANULARITIES, default="hour")
+    parser.add_argument("--since", help="first bucket, e.g. '2025-01-01' or '2025-01-01 13:00:00'")
+    parser.add_argument("--until", help="end bucket (excluded)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from the raw tables")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        database.ensure_schema("moderation_rollups", CREATE_SQL)
+        with database.transaction() as conn:
+            rebuild(conn)
+        print("✅ Rollups rebuilt.")
+
+    rows = fetch_rollups(args.granularity, args.since, args.until)
+    # Category rates per analysed answer are easier to read than raw counts
+    table = []
+    for bucket, analysed, rejected, *counts in rows:
+        flags, risks = counts[:len(FLAG_COLUMNS)], counts[len(FLAG_COLUMNS):]
+        rates = [f"{count / analysed:.1%}" if analysed else "-" for count in flags]
+        table.append((bucket, analysed, rejected, *rates, " ".join(map(str, risks))))
+    headers = [args.granularity, "analysed", "rejected", *FLAG_COLUMNS, "risk 0..9"]
+    print(tabulate(table, headers=headers, tablefmt="grid"))
+
+
+if __name__ == "__main__":
+    main()
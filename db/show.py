@@ -1,3 +1,28 @@
-from db.database import fetch_all
+import argparse
 
-print(fetch_all())
+from tabulate import tabulate
+
+from db.database import FLAG_COLUMNS, RESULT_COLUMNS, export_rows, fetch_results_page, iter_results
+
+parser = argparse.ArgumentParser(description="Browse or export the moderation_results table.")
+parser.add_argument("--limit", type=int, default=50, help="rows per page")
+parser.add_argument("--page", type=int, default=1, help="page number (--after-id is faster for deep pages)")
+parser.add_argument("--after-id", type=int, default=0, help="start after this id (printed under each page)")
+parser.add_argument("--since", help="created_at >= 'YYYY-MM-DD[ HH:MM:SS]' (UTC)")
+parser.add_argument("--until", help="created_at < 'YYYY-MM-DD[ HH:MM:SS]' (UTC)")
+parser.add_argument("--min-risk", type=int, help="risk_score >= N")
+parser.add_argument("--category", choices=FLAG_COLUMNS)
+parser.add_argument("--export", metavar="PATH", help="stream every matching row to a .csv or .jsonl file")
+args = parser.parse_args()
+
+filters = {"since": args.since, "until": args.until, "min_risk": args.min_risk, "category": args.category}
+
+if args.export:
+    count = export_rows(iter_results(**filters), RESULT_COLUMNS, args.export)
+    print(f"✅ {count} rows exported to {args.export}")
+else:
+    offset = (args.page - 1) * args.limit
+    rows = fetch_results_page(after_id=args.after_id, limit=args.limit, offset=offset, **filters)
+    print(tabulate(rows, headers=RESULT_COLUMNS, tablefmt="grid"))
+    if len(rows) == args.limit:
+        print(f"Next page: --after-id {rows[-1][0]}")
@@ -0,0 +1,25 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from tabulate import tabulate
+
+from db.database import FLAG_COLUMNS, count_by_category, decode_flags, fetch_flagged
+
+parser = argparse.ArgumentParser(description="Flagged answers per moderation category.")
+parser.add_argument("--hours", type=float, default=None, help="only the last N hours")
+parser.add_argument("--category", choices=FLAG_COLUMNS, help="list the answers flagged with this category")
+parser.add_argument("--limit", type=int, default=20)
+args = parser.parse_args()
+
+# created_at is stored by SQLite's CURRENT_TIMESTAMP, in UTC
+since = datetime.now(timezone.utc) - timedelta(hours=args.hours) if args.hours else None
+
+if args.category:
+    rows = [
+        (id_, prompt, answer, ", ".join(decode_flags(flags)), risk_score, created_at)
+        for id_, prompt, answer, flags, risk_score, created_at in fetch_flagged(args.category, since, limit=args.limit)
+    ]
+    headers = ["id", "prompt", "answer", "categories", "risk_score", "created_at"]
+    print(tabulate(rows, headers=headers, tablefmt="grid", maxcolwidths=[None, 40, 60, 30, None, None]))
+else:
+    print(tabulate(count_by_category(since).items(), headers=["category", "count"], tablefmt="grid"))
@@ -0,0 +1,14 @@
+import argparse
+import time
+
+from tabulate import tabulate
+
+from db.metrics import stage_percentiles
+
+parser = argparse.ArgumentParser(description="Latency percentiles per pipeline stage (ms).")
+parser.add_argument("--hours", type=float, default=None, help="only the last N hours")
+args = parser.parse_args()
+
+since = time.time() - args.hours * 3600 if args.hours else None
+headers = ["stage", "count", "errors", "p50", "p95", "p99", "max"]
+print(tabulate(stage_percentiles(since), headers=headers, tablefmt="grid", floatfmt=".1f"))
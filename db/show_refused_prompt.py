@@ -1,3 +1,26 @@
-from db.database import fetch_all_rejected
+import argparse
 
-print(fetch_all_rejected())
\ No newline at end of file
+from tabulate import tabulate
+
+from db.database import REJECTED_COLUMNS, export_rows, fetch_rejected_page, iter_rejected
+
+parser = argparse.ArgumentParser(description="Browse or export the rejected_prompts table.")
+parser.add_argument("--limit", type=int, default=50, help="rows per page")
+parser.add_argument("--page", type=int, default=1, help="page number (--after-id is faster for deep pages)")
+parser.add_argument("--after-id", type=int, default=0, help="start after this id (printed under each page)")
+parser.add_argument("--since", help="created_at >= 'YYYY-MM-DD[ HH:MM:SS]' (UTC)")
+parser.add_argument("--until", help="created_at < 'YYYY-MM-DD[ HH:MM:SS]' (UTC)")
+parser.add_argument("--export", metavar="PATH", help="stream every matching row to a .csv or .jsonl file")
+args = parser.parse_args()
+
+filters = {"since": args.since, "until": args.until}
+
+if args.export:
+    count = export_rows(iter_rejected(**filters), REJECTED_COLUMNS, args.export)
+    print(f"✅ {count} rows exported to {args.export}")
+else:
+    offset = (args.page - 1) * args.limit
+    rows = fetch_rejected_page(after_id=args.after_id, limit=args.limit, offset=offset, **filters)
+    print(tabulate(rows, headers=REJECTED_COLUMNS, tablefmt="grid"))
+    if len(rows) == args.limit:
+        print(f"Next page: --after-id {rows[-1][0]}")
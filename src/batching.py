@@ -0,0 +1,153 @@
+"""
+Coalesce small moderation requests into batched calls.
+
+MicroBatcher queues texts submitted by concurrent asyncio callers and
+dispatches them in batches of up to `max_batch`, waiting at most
+`window_ms` for a batch to fill (used by src/moderation_service.py).
+BackgroundBatcher runs one on its own event-loop thread so that plain
+threads (e.g. concurrent streamed generations) can share it.
+"""
+import asyncio
+import atexit
+import threading
+
+from config import MODERATION_BATCH_SIZE, MODERATION_BATCH_WINDOW_MS, MODERATION_MAX_INFLIGHT
+
+
+class MicroBatcher:
+    """
+    Coalesce texts submitted by concurrent callers into batched calls.
+
+    `classify` is a blocking function taking a list of texts and returning
+    one verdict per text; it runs in a worker thread, with at most
+    `max_inflight` batches in flight at once.
+    """
+
+    def __init__(self, classify, max_batch=MODERATION_BATCH_SIZE, window_ms=MODERATION_BATCH_WINDOW_MS,
+                 max_inflight=MODERATION_MAX_INFLIGHT):
+        self.classify = classify
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.max_inflight = max_inflight
+        self._queue = None
+        self._inflight = None
+        self._task = None
+        self.texts = 0
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, texts):
+        """Queue texts and wait for their verdicts (in the same order)."""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        for text, future in zip(texts, futures):
+            self._queue.put_nowait((text, future))
+        self.requests += 1
+        return await asyncio.gather(*futures)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Wait for a free slot, then keep collecting while this batch runs
+            await self._inflight.acquire()
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            texts = [text for text, _ in batch]
+            self.batches += 1
+            self.texts += len(texts)
+            try:
+                verdicts = await asyncio.to_thread(self.classify, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            verdicts = list(verdicts)
+            for (_, future), verdict in zip(batch, verdicts):
+                if not future.done():
+                    future.set_result(verdict)
+            # A short answer must not leave callers waiting forever
+            if len(verdicts) != len(batch):
+                error = RuntimeError(f"Moderation returned {len(verdicts)} verdicts for {len(batch)} texts.")
+                for _, future in batch[len(verdicts):]:
+                    if not future.done():
+                        future.set_exception(error)
+        finally:
+            self._inflight.release()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "texts_per_batch": self.texts / self.batches if self.batches else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+class BackgroundBatcher:
+    """
+    Blocking front-end of a MicroBatcher, callable from any thread:
+    batcher(texts) returns one verdict per text, like `classify`.
+
+    The event loop thread is started on the first call.
+    """
+
+    def __init__(self, classify, **kwargs):
+        self.batcher = MicroBatcher(classify, **kwargs)
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="micro-batcher", daemon=True).start()
+
+                async def start():
+                    self.batcher.start()
+                asyncio.run_coroutine_threadsafe(start(), loop).result()
+                self._loop = loop
+                atexit.register(self.close)
+        return self._loop
+
+    def close(self):
+        """Stop the collecting task and the loop thread."""
+        loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.batcher.stop(), loop).result(timeout=5)
+            loop.call_soon_threadsafe(loop.stop)
+
+    def __call__(self, texts):
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self.batcher.submit(list(texts)), loop).result()
+
+    def stats(self):
+        return self.batcher.stats()
@@ -0,0 +1,159 @@
+"""
+Moderate a large file of prompts in bulk, e.g. to re-screen logged prompts
+after the Groq policy changed.
+
+Records are streamed from a JSONL file (one string or object per line) or
+a CSV file with a header, and moderated with bounded concurrency:
+
+  --via groq     Groq policy verdict (--groq-batch prompts per request);
+                 violations go to rejected_prompts
+  --via mistral  Mistral categories for every record, into moderation_results
+  --via both     Groq first, then Mistral for the accepted records
+
+Results are written one chunk at a time, in the same transaction as the
+job's checkpoint (bulk_jobs table), so an interrupted run picks up after
+the last committed chunk. The default job id includes the input path, the
+mode and a hash of the policy: editing the policy starts a fresh pass.
+
+Usage: python -m src.bulk_moderate prompts.jsonl [--via groq] [--concurrency 8] [--restart]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from config import BULK_CHUNK_SIZE, BULK_CONCURRENCY, GROQ_BATCH_SIZE, GROQ_MODERATION_MODEL, MODERATION_BATCH_SIZE
+from db.database import load_bulk_checkpoint, save_bulk_batch
+from .discriminator import classify_texts
+from .run_groq import classify_prompts, policy
+
+
+def iter_records(path, field="prompt", text_field=None):
+    """
+    Yield (prompt, text) pairs from a .jsonl or .csv file; `text` is what
+    Mistral moderates and defaults to the prompt itself.
+
+    Unusable records yield (None, None) so positions stay stable for resuming.
+    """
+    path = Path(path)
+    text_field = text_field or field
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (_parse_line(line) for line in f)
+        for row in rows:
+            if isinstance(row, str):
+                yield row, row
+            elif isinstance(row, dict) and row.get(field):
+                yield row[field], row.get(text_field) or row[field]
+            else:
+                yield None, None
+
+
+def _parse_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+def default_job_id(path, via):
+    policy_hash = hashlib.sha256(f"{GROQ_MODERATION_MODEL}\0{policy}".encode("utf-8")).hexdigest()[:12]
+    return f"{Path(path).resolve()}:{via}:{policy_hash}"
+
+
+def moderate_chunk(records, via, pool, groq_batch=GROQ_BATCH_SIZE):
+    """Moderate one chunk; returns (rejected pairs, analysis records)."""
+    records = [(prompt, text) for prompt, text in records if prompt]
+    groq_batch = max(1, groq_batch)
+    rejected = []
+
+    if via in ("groq", "both"):
+        # Several prompts per Groq request (classify_prompts), batches in parallel
+        batches = [records[i:i + groq_batch] for i in range(0, len(records), groq_batch)]
+        results = pool.map(lambda batch: classify_prompts([prompt for prompt, _ in batch], batch_size=groq_batch),
+                           batches)
+        verdicts = [verdict for batch_verdicts in results for verdict in batch_verdicts]
+        accepted = []
+        for record, verdict in zip(records, verdicts):
+            if verdict["violation"] == 1:
+                rejected.append((record[0], verdict.get("rationale", "violation")))
+            else:
+                accepted.append(record)
+        records = accepted
+
+    analyses = []
+    if via in ("mistral", "both") and records:
+        batches = [records[i:i + MODERATION_BATCH_SIZE] for i in range(0, len(records), MODERATION_BATCH_SIZE)]
+        results = pool.map(lambda batch: classify_texts([text for _, text in batch]), batches)
+        for batch, verdicts in zip(batches, results):
+            for (prompt, text), verdict in zip(batch, verdicts):
+                analyses.append({"prompt": prompt, "answer": text, **verdict})
+
+    return rejected, analyses
+
+
+def bulk_moderate(path, via="groq", field="prompt", text_field=None, job_id=None,
+                  chunk_size=BULK_CHUNK_SIZE, concurrency=BULK_CONCURRENCY, restart=False,
+                  groq_batch=GROQ_BATCH_SIZE):
+    job_id = job_id or default_job_id(path, via)
+    position = 0 if restart else load_bulk_checkpoint(job_id)
+    if position:
+        print(f"↩️ Resuming job after {position} records.")
+
+    records = islice(iter_records(path, field, text_field), position, None)
+    totals = {"records": 0, "rejected": 0, "analysed": 0, "flagged": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            rejected, analyses = moderate_chunk(chunk, via, pool, groq_batch)
+            position += len(chunk)
+            save_bulk_batch(job_id, str(path), position, rejected, analyses)
+
+            totals["records"] += len(chunk)
+            totals["rejected"] += len(rejected)
+            totals["analysed"] += len(analyses)
+            totals["flagged"] += sum(1 for a in analyses if a.get("risk_score"))
+            rate = totals["records"] / (time.perf_counter() - start)
+            print(f"📦 {position} records done ({totals['rejected']} rejected, "
+                  f"{totals['flagged']}/{totals['analysed']} flagged) - {rate:.1f} records/s")
+
+    print(f"✅ Job finished: {totals}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help=".jsonl or .csv file")
+    parser.add_argument("--via", choices=("groq", "mistral", "both"), default="groq")
+    parser.add_argument("--field", default="prompt", help="JSON key / CSV column holding the prompt")
+    parser.add_argument("--text-field", help="key / column Mistral should moderate (default: the prompt)")
+    parser.add_argument("--job", help="job id for checkpoints (default: path, mode and policy hash)")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="records per transaction")
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY, help="API calls in flight")
+    parser.add_argument("--groq-batch", type=int, default=GROQ_BATCH_SIZE,
+                        help="prompts per Groq request (1 = one request per prompt)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+
+    try:
+        bulk_moderate(args.path, args.via, args.field, args.text_field, args.job,
+                      args.chunk_size, args.concurrency, args.restart, args.groq_batch)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted: run the same command again to resume.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Shared API clients for Groq and Mistral, with client-side rate limiting
+and retries.
+
+- One long-lived client per provider (the SDKs keep their HTTP connection
+  pool alive between calls), created on first use.
+- A token bucket per provider, sized to its quota (GROQ_RPM / MISTRAL_RPM),
+  makes callers wait instead of getting 429s.
+- call_with_retry() retries 429s, 5xx and connection errors with exponential
+  backoff and full jitter, and honours Retry-After when the provider sends it.
+- stats() returns per-provider counters (calls, throttled, rate_limited,
+  retries, failures).
+
+Usage: call_with_retry("groq", get_client("groq").chat.completions.create, messages=..., model=...)
+"""
+import os
+import random
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from config import (
+    GROQ_BURST,
+    GROQ_RPM,
+    MISTRAL_API_KEY,
+    MISTRAL_BURST,
+    MISTRAL_RPM,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+from db.metrics import record
+
+load_dotenv()
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the time waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _bucket(rpm, burst):
+    return TokenBucket(rpm / 60, max(1, burst)) if rpm > 0 else None
+
+
+def _create_groq():
+    from groq import Groq
+    # Retries are handled by call_with_retry, with the shared rate limiter
+    return Groq(api_key=os.getenv("GROQ_API_KEY", ""), max_retries=0)
+
+
+def _create_mistral():
+    from mistralai import Mistral
+    return Mistral(api_key=MISTRAL_API_KEY)
+
+
+_factories = {"groq": _create_groq, "mistral": _create_mistral}
+_clients = {}
+_limiters = {"groq": _bucket(GROQ_RPM, GROQ_BURST), "mistral": _bucket(MISTRAL_RPM, MISTRAL_BURST)}
+_counters = {}
+_lock = threading.Lock()
+
+
+def get_client(provider: str):
+    """Long-lived client for `provider` ("groq" or "mistral"), created on first use."""
+    client = _clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = _factories[provider]()
+    return client
+
+
+def set_client(provider: str, client):
+    """Install `client` for `provider`; get_client() returns it and the factory is never called."""
+    with _lock:
+        _clients[provider] = client
+
+
+def set_rate_limit(provider: str, rpm: float, burst: float = 1):
+    """Resize a provider's limiter; rpm <= 0 disables it."""
+    _limiters[provider] = _bucket(rpm, burst)
+
+
+def _count(provider, name, amount=1):
+    with _lock:
+        counters = _counters.setdefault(
+            provider, {"calls": 0, "throttled": 0, "rate_limited": 0, "retries": 0, "failures": 0}
+        )
+        counters[name] += amount
+
+
+def stats():
+    """Per-provider counters since start-up."""
+    with _lock:
+        return {provider: dict(counters) for provider, counters in _counters.items()}
+
+
+def _status_and_headers(error):
+    """Best-effort (HTTP status, response headers) of an SDK exception."""
+    response = getattr(error, "response", None)
+    if response is None:
+        response = getattr(error, "raw_response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    return status, headers
+
+
+def _is_retryable(error, status):
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # No HTTP response at all: connection reset, timeout, DNS... The Mistral
+    # SDK lets httpx errors through; Groq wraps them in APIConnectionError /
+    # APITimeoutError (matched by name so groq is only imported when used)
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in ("APIConnectionError", "APITimeoutError") for cls in type(error).__mro__)
+
+
+def _retry_after(headers):
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, retry_after=None):
+    """Full-jitter exponential backoff, or the server's Retry-After when given."""
+    if retry_after is not None:
+        return min(RETRY_MAX_DELAY, retry_after) + random.uniform(0, RETRY_BASE_DELAY)
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def call_with_retry(provider: str, func, *args, max_attempts: int = RETRY_MAX_ATTEMPTS, **kwargs):
+    """Call `func` under the provider's rate limiter, retrying transient errors."""
+    for attempt in range(max_attempts):
+        limiter = _limiters.get(provider)
+        if limiter is not None:
+            waited = limiter.acquire()
+            if waited:
+                _count(provider, "throttled")
+                record(f"{provider}.throttle_wait", waited * 1000)
+
+        _count(provider, "calls")
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            status, headers = _status_and_headers(e)
+            if status == 429:
+                _count(provider, "rate_limited")
+            if not _is_retryable(e, status) or attempt == max_attempts - 1:
+                _count(provider, "failures")
+                raise
+            delay = backoff_delay(attempt, _retry_after(headers))
+            _count(provider, "retries")
+            print(f"🔁 {provider} call failed ({status or type(e).__name__}), "
+                  f"retry {attempt + 1}/{max_attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
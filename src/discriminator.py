@@ -1,14 +1,74 @@
 import json
-from mistralai import Mistral
 from dotenv import load_dotenv
-from config import DATA_DIR, MISTRAL_API_KEY
-from db.database import save_analysis
+from config import OUTPUT_LOG_PATH, MODERATION_SERVICE_URL
+from db.database import save_analyses
+from db.metrics import timed
+from .jsonl_log import JsonlWriter
+from . import clients
 
 load_dotenv()
 
+# Every moderation result, appended as one JSON line (read back with iter_jsonl)
+output_log = JsonlWriter(OUTPUT_LOG_PATH)
 
-def moderate_multiple_texts(texts):
-    client = Mistral(api_key=MISTRAL_API_KEY)
+
+def get_client():
+    """Shared Mistral client (see src/clients.py)."""
+    return clients.get_client("mistral")
+
+
+def set_client(client):
+    """Classify answers with `client`: any object exposing classifiers.moderate_chat like mistralai.Mistral."""
+    clients.set_client("mistral", client)
+
+
+CATEGORIES = (
+    "sexual",
+    "hate_and_discrimination",
+    "violence_and_threats",
+    "dangerous_and_criminal_content",
+    "selfharm",
+    "health",
+    "financial",
+    "law",
+    "pii",
+)
+
+
+def classify_texts(texts):
+    """
+    Moderate a batch of texts, without touching the DB.
+
+    Returns one dict per text with a boolean per category and a
+    "risk score" = number of True flags. When MODERATION_SERVICE_URL is
+    set, the batch goes through the shared moderation service
+    (src/moderation_service.py) instead of calling Mistral directly.
+    """
+    if MODERATION_SERVICE_URL:
+        return _classify_remote(texts)
+    return classify_texts_local(texts)
+
+
+_http_client = None
+
+
+@timed("moderation_service")
+def _classify_remote(texts):
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(base_url=MODERATION_SERVICE_URL, timeout=30.0)
+    def post():
+        response = _http_client.post("/classify", json={"texts": list(texts)})
+        response.raise_for_status()
+        return response
+    return clients.call_with_retry("moderation_service", post).json()["results"]
+
+
+@timed("mistral_moderation")
+def classify_texts_local(texts):
+    """Call Mistral moderation directly with the long-lived client."""
+    client = get_client()
     model = "mistral-moderation-latest"
 
     inputs = [
@@ -16,55 +76,65 @@ def moderate_multiple_texts(texts):
         for text in texts
     ]
 
-    response = client.classifiers.moderate_chat(
+    response = clients.call_with_retry(
+        "mistral",
+        client.classifiers.moderate_chat,
         model=model,
         inputs=inputs
     )
 
-    json_outputs = []
-
-    for text, result in zip(texts, response.results):
+    verdicts = []
+    for result in response.results:
         categories = result.categories
+        verdict = {name: bool(categories.get(name, False)) for name in CATEGORIES}
+        verdict["risk_score"] = sum(verdict[name] for name in CATEGORIES)
+        verdicts.append(verdict)
+    return verdicts
+
+
+@timed("moderate_multiple_texts")
+def moderate_multiple_texts(texts, prompt=None, row_ids=None, verdicts=None):
+    """
+    Moderate a batch of answers with Mistral and store the verdicts in the DB.
+
+    `row_ids` are the rows reserved by save_prompts for this batch: result i
+    is written to row_ids[i]. Without them, results go to the empty rows
+    reserved for `prompt` (or the next empty rows of any prompt).
+    `verdicts` are verdicts already computed for the texts (e.g. by
+    streaming moderation); only the texts without one (None) are sent to
+    Mistral.
+    """
+    if not texts:
+        return []
+    if row_ids is not None and len(row_ids) < len(texts):
+        raise ValueError(f"{len(texts)} answers but only {len(row_ids)} reserved rows.")
+
+    verdicts = list(verdicts) if verdicts is not None else [None] * len(texts)
+    missing = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    if missing:
+        for i, verdict in zip(missing, classify_texts([texts[i] for i in missing])):
+            verdicts[i] = verdict
 
+    json_outputs = []
+
+    for i, (text, verdict) in enumerate(zip(texts, verdicts)):
         output = {
-            "prompt": None,  # you don't need it for the DB, can leave or remove
+            "id": row_ids[i] if row_ids is not None else None,
+            "prompt": prompt,  # used by save_analysis to pick the prompt's rows
             "answer": text,
-            "sexual": bool(categories.get("sexual", False)),
-            "hate_and_discrimination": bool(categories.get("hate_and_discrimination", False)),
-            "violence_and_threats": bool(categories.get("violence_and_threats", False)),
-            "dangerous_and_criminal_content": bool(categories.get("dangerous_and_criminal_content", False)),
-            "selfharm": bool(categories.get("selfharm", False)),
-            "health": bool(categories.get("health", False)),
-            "financial": bool(categories.get("financial", False)),
-            "law": bool(categories.get("law", False)),
-            "pii": bool(categories.get("pii", False)),
+            **verdict,
         }
 
-        # Compute a "risk score" = number of True flags
-        output["risk_score"] = sum([
-            output["sexual"],
-            output["hate_and_discrimination"],
-            output["violence_and_threats"],
-            output["dangerous_and_criminal_content"],
-            output["selfharm"],
-            output["health"],
-            output["financial"],
-            output["law"],
-            output["pii"]
-        ])
-
         json_outputs.append(output)
-
-        # 👇 Store this result into the next empty DB row
-        save_analysis(output)
-
-        with open(DATA_DIR / "output.json", "w") as file:
-            file.write(json.dumps(json_outputs, ensure_ascii=False, indent=2))
+        output_log.append(output)
 
         # Print individual JSON result
         print(json.dumps(output, ensure_ascii=False, indent=2))
         print("\n----------------------------------------\n")
 
+    # 👇 Store the whole batch in one transaction
+    save_analyses(json_outputs)
+
     # Sort results by safest → most dangerous
     json_outputs_sorted = sorted(json_outputs, key=lambda x: x["risk_score"])
 
@@ -0,0 +1,206 @@
+"""
+Build or update the ./chroma_db vector store used by src/query.py.
+
+Documents are streamed from disk one file at a time, split into chunks,
+embedded in batches with all-MiniLM-L6-v2 and upserted into Chroma.
+
+- Chunk ids are content hashes, so unchanged chunks are never re-embedded.
+- A manifest (file hash per source file) lets unchanged files be skipped
+  after hashing them, without chunking or querying Chroma. An interrupted
+  run resumes at the first file not fully ingested, and the chunks of that
+  file already stored are skipped by id.
+- Chunks of a changed or deleted file that no longer exist are removed.
+
+Usage: python -m src.ingest [SOURCE_DIR] [--batch-size 64] [--rebuild]
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from config import (
+    INGEST_BATCH_SIZE,
+    INGEST_CHUNK_OVERLAP,
+    INGEST_CHUNK_SIZE,
+    INGEST_MANIFEST_PATH,
+    INGEST_SOURCE_DIR,
+)
+
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".pdf"}
+
+
+def iter_source_files(source_dir):
+    """Yield supported files under source_dir in a stable order."""
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = Path(root) / name
+            if path.suffix.lower() in SUPPORTED_EXTENSIONS:
+                yield path
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_text(path):
+    if path.suffix.lower() == ".pdf":
+        from pypdf import PdfReader
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+def chunk_id(source, text):
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+def iter_chunks(path, splitter):
+    """Yield (id, text, metadata) for each chunk of one file."""
+    source = str(path)
+    for index, text in enumerate(splitter.split_text(read_text(path))):
+        yield chunk_id(source, text), text, {"source": source, "chunk": index}
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------- manifest ----------
+
+def load_manifest(path=INGEST_MANIFEST_PATH):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, path=INGEST_MANIFEST_PATH):
+    """Write atomically so a crash never leaves a truncated manifest."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ---------- ingestion ----------
+
+def ingest_file(docsearch, path, splitter, batch_size):
+    """Upsert the new chunks of one file and delete its stale ones. Returns (added, skipped, removed)."""
+    source = str(path)
+    existing = set(docsearch.get(where={"source": source}, include=[])["ids"])
+    seen = set()
+    added = skipped = 0
+
+    for batch in batched(iter_chunks(path, splitter), batch_size):
+        new = []
+        for i, text, meta in batch:
+            # Identical chunks share an id: only the first one is stored
+            if i in seen:
+                continue
+            seen.add(i)
+            if i not in existing:
+                new.append((i, text, meta))
+        skipped += len(batch) - len(new)
+        if new:
+            ids, texts, metadatas = zip(*new)
+            # add_texts embeds the whole batch in one call and upserts by id
+            docsearch.add_texts(texts=list(texts), metadatas=list(metadatas), ids=list(ids))
+            added += len(new)
+
+    stale = list(existing - seen)
+    if stale:
+        docsearch.delete(ids=stale)
+    return added, skipped, len(stale)
+
+
+def ingest(source_dir=INGEST_SOURCE_DIR, batch_size=INGEST_BATCH_SIZE, chunk_size=INGEST_CHUNK_SIZE,
+           chunk_overlap=INGEST_CHUNK_OVERLAP, rebuild=False):
+    from langchain_community.vectorstores import Chroma
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from .query import VECTOR_STORE_PATH, get_embeddings
+
+    source_dir = Path(source_dir)
+    if not source_dir.is_dir():
+        raise FileNotFoundError(f"Source directory not found: {source_dir}")
+
+    # A manifest describing a store that no longer exists is worthless
+    store_exists = os.path.exists(VECTOR_STORE_PATH)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    docsearch = Chroma(persist_directory=VECTOR_STORE_PATH, embedding_function=get_embeddings())
+
+    manifest = load_manifest() if store_exists and not rebuild else {}
+    settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    if manifest.get("settings", settings) != settings:
+        # Different chunking produces different chunks: nothing can be skipped
+        manifest = {}
+    manifest["settings"] = settings
+    files = manifest.setdefault("files", {})
+
+    start = time.perf_counter()
+    totals = {"files": 0, "unchanged_files": 0, "added": 0, "skipped": 0, "removed": 0}
+    present = set()
+
+    for path in iter_source_files(source_dir):
+        source = str(path)
+        present.add(source)
+        digest = file_hash(path)
+        if files.get(source) == digest:
+            totals["unchanged_files"] += 1
+            continue
+
+        added, skipped, removed = ingest_file(docsearch, path, splitter, batch_size)
+        # The file is only marked done once all its chunks are stored
+        files[source] = digest
+        save_manifest(manifest)
+
+        totals["files"] += 1
+        totals["added"] += added
+        totals["skipped"] += skipped
+        totals["removed"] += removed
+        print(f"📄 {source}: {added} chunks added, {skipped} unchanged, {removed} removed")
+
+    # Files deleted from disk since the last run
+    for source in [s for s in files if s not in present]:
+        stale = docsearch.get(where={"source": source}, include=[])["ids"]
+        if stale:
+            docsearch.delete(ids=stale)
+            totals["removed"] += len(stale)
+        del files[source]
+    save_manifest(manifest)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Ingestion done in {elapsed:.1f}s: {totals}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source_dir", nargs="?", default=INGEST_SOURCE_DIR)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="chunks embedded per call")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=INGEST_CHUNK_OVERLAP)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and re-check every file")
+    args = parser.parse_args()
+
+    ingest(args.source_dir, args.batch_size, args.chunk_size, args.chunk_overlap, args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
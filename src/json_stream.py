@@ -0,0 +1,106 @@
+"""
+Tolerant JSON helpers for model outputs.
+
+- extract_json() recovers a JSON object (or array) wrapped in a ```json
+  fence or surrounded by prose, instead of failing on json.loads.
+- VerdictParser is fed a streamed completion chunk by chunk and reports
+  the "violation" field as soon as its value is complete, long before the
+  rationale that follows it has been generated.
+- StreamedVerdict is the moderation result handed to callers while the
+  rest of the stream is still being read: "violation" is available at
+  once, every other key waits for the full verdict.
+"""
+import json
+import re
+import threading
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.S | re.I)
+# "violation": 1 / "1" / true, followed by a delimiter so the value is complete
+_VIOLATION = re.compile(r'"violation"\s*:\s*"?(0|1|true|false)"?\s*[,}\n]', re.I)
+
+
+def extract_json(text, kind=dict):
+    """
+    Parse the first JSON value of type `kind` (dict or list) in `text`.
+
+    Raises ValueError when there is none.
+    """
+    text = (text or "").strip()
+    fence = _FENCE.search(text)
+    if fence:
+        text = fence.group(1).strip()
+    try:
+        value = json.loads(text)
+        if isinstance(value, kind):
+            return value
+    except json.JSONDecodeError:
+        pass
+
+    decoder = json.JSONDecoder()
+    opening = "{" if kind is dict else "["
+    start = text.find(opening)
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, kind):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find(opening, start + 1)
+    raise ValueError(f"No JSON {kind.__name__} found in model output: {text[:200]!r}")
+
+
+class VerdictParser:
+    """Accumulates streamed text and spots the "violation" value early."""
+
+    def __init__(self):
+        self.text = ""
+        self.violation = None
+
+    def feed(self, chunk):
+        """Add a chunk; returns the violation (0/1) once known, else None."""
+        if chunk:
+            self.text += chunk
+        if self.violation is None:
+            match = _VIOLATION.search(self.text)
+            if match:
+                self.violation = int(match.group(1).lower() in ("1", "true"))
+        return self.violation
+
+
+class StreamedVerdict(dict):
+    """
+    Moderation result whose "violation" is known before the rest.
+
+    Reading any other key (or calling wait()) blocks until complete() has
+    been called with the full verdict by the thread reading the stream.
+    """
+
+    def __init__(self, violation):
+        super().__init__(violation=violation)
+        self._done = threading.Event()
+
+    def complete(self, result):
+        result = dict(result)
+        # The early decision is the one the caller acted on
+        result["violation"] = self["violation"]
+        super().update(result)
+        self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self
+
+    def __getitem__(self, key):
+        if key != "violation":
+            self._done.wait()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key != "violation":
+            self._done.wait()
+        return super().get(key, default)
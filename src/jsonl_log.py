@@ -0,0 +1,129 @@
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+
+from config import JSONL_BUFFER_SIZE, JSONL_FLUSH_INTERVAL, JSONL_FSYNC, JSONL_MAX_BYTES, JSONL_BACKUPS
+
+# Live writers, flushed once at exit; a writer collected earlier (e.g. a
+# local in a function that returned) flushes itself in __del__
+_writers = weakref.WeakSet()
+
+
+def _flush_all():
+    for writer in list(_writers):
+        writer.flush()
+
+
+atexit.register(_flush_all)
+
+
+class JsonlWriter:
+    """
+    Append-only JSON Lines sink.
+
+    Records are buffered in memory and appended to `path` when the buffer
+    holds `buffer_size` records or `flush_interval` seconds have passed, so
+    writing n records costs O(n) I/O instead of rewriting the whole file.
+    When the file grows past `max_bytes` it is rotated to path.1, path.2, ...
+    keeping at most `backups` old files.
+    """
+
+    def __init__(self, path, buffer_size=JSONL_BUFFER_SIZE, flush_interval=JSONL_FLUSH_INTERVAL,
+                 fsync=JSONL_FSYNC, max_bytes=JSONL_MAX_BYTES, backups=JSONL_BACKUPS):
+        self.path = Path(path)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        _writers.add(self)
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._buffer.append(line)
+            if (len(self._buffer) >= self.buffer_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "\n".join(self._buffer) + "\n"
+        self._buffer.clear()
+
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(data)
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+            size = file.tell()
+
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """path -> path.1 -> path.2 ...; the oldest backup is dropped."""
+        if self.backups <= 0:
+            self.path.unlink()
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+    def __del__(self):
+        if self._buffer:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+def iter_jsonl(path, include_rotated=True):
+    """
+    Lazily yield the records of a JSONL file, one line at a time.
+
+    With include_rotated, rotated backups (path.N ... path.1) are read
+    first so records come back oldest to newest.
+    """
+    path = Path(path)
+    files = []
+    if include_rotated:
+        backups = sorted(
+            (p for p in path.parent.glob(f"{path.name}.*") if p.suffix[1:].isdigit()),
+            key=lambda p: int(p.suffix[1:]),
+            reverse=True,
+        )
+        files.extend(backups)
+    if path.exists():
+        files.append(path)
+
+    for file_path in files:
+        with open(file_path, encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
@@ -0,0 +1,91 @@
+"""
+HTTP moderation service shared by many chat sessions.
+
+Requests from all callers are queued and coalesced into Mistral
+moderate_chat batches of up to MODERATION_BATCH_SIZE texts, waiting at most
+MODERATION_BATCH_WINDOW_MS for a batch to fill. Results are fanned back out
+to each caller in order. One long-lived Mistral client serves every batch.
+
+Endpoints:
+  POST /classify  {"texts": [...]}                          -> {"results": [verdict, ...]}
+  POST /moderate  {"texts": [...], "prompt": ..., "row_ids": [...]}
+                  same, and the verdicts are stored like moderate_multiple_texts
+  GET  /stats     batching counters
+
+Usage: python -m src.moderation_service   (clients set MODERATION_SERVICE_URL)
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from config import MODERATION_SERVICE_HOST, MODERATION_SERVICE_PORT
+from db.database import save_analyses
+from . import clients
+from .batching import MicroBatcher
+from .discriminator import classify_texts_local, output_log
+
+
+batcher = MicroBatcher(classify_texts_local)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    batcher.start()
+    yield
+    await batcher.stop()
+    output_log.flush()
+
+
+app = FastAPI(title="Moderation service", lifespan=lifespan)
+
+
+class ClassifyRequest(BaseModel):
+    texts: List[str]
+
+
+class ModerateRequest(BaseModel):
+    texts: List[str]
+    prompt: Optional[str] = None
+    row_ids: Optional[List[int]] = None
+
+
+@app.post("/classify")
+async def classify(request: ClassifyRequest):
+    return {"results": await batcher.submit(request.texts)}
+
+
+@app.post("/moderate")
+async def moderate(request: ModerateRequest):
+    if request.row_ids is not None and len(request.row_ids) < len(request.texts):
+        raise HTTPException(400, f"{len(request.texts)} texts but only {len(request.row_ids)} row_ids.")
+
+    verdicts = await batcher.submit(request.texts)
+    outputs = [
+        {
+            "id": request.row_ids[i] if request.row_ids is not None else None,
+            "prompt": request.prompt,
+            "answer": text,
+            **verdict,
+        }
+        for i, (text, verdict) in enumerate(zip(request.texts, verdicts))
+    ]
+    await asyncio.to_thread(save_analyses, outputs)
+    output_log.extend(outputs)
+    return {"results": outputs}
+
+
+@app.get("/stats")
+async def stats():
+    return {**batcher.stats(), "clients": clients.stats()}
+
+
+def main():
+    import uvicorn
+    uvicorn.run(app, host=MODERATION_SERVICE_HOST, port=MODERATION_SERVICE_PORT)
+
+
+if __name__ == "__main__":
+    main()
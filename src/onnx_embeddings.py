@@ -0,0 +1,150 @@
+"""
+all-MiniLM-L6-v2 embeddings on onnxruntime, without PyTorch at run time.
+
+The model is exported once to ONNX and quantized to int8 (dynamic
+quantization of the weights). At run time only onnxruntime, tokenizers and
+numpy are loaded. Texts are tokenized and run in batches, sorted by length
+to limit padding, then mean-pooled over the attention mask and
+L2-normalized exactly like the sentence-transformers pipeline, so the
+vectors stay compatible with the existing chroma_db collection.
+
+Export (needs torch + transformers, once):
+  python -m src.onnx_embeddings --export [--output data/onnx/all-MiniLM-L6-v2]
+"""
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+
+from config import EMBEDDINGS_BATCH_SIZE, EMBEDDINGS_THREADS, ONNX_MODEL_DIR, ONNX_QUANTIZED
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # only needed to plug into LangChain / Chroma
+    Embeddings = object
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_SEQ_LENGTH = 256  # sentence-transformers' max_seq_length for this model
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain-compatible embeddings backed by an exported MiniLM ONNX model."""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, batch_size=EMBEDDINGS_BATCH_SIZE,
+                 threads=EMBEDDINGS_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / (INT8_FILE if quantized else FP32_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"ONNX model not found at {model_path}. "
+                "Please run `python -m src.onnx_embeddings --export` first."
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.no_padding()  # padded per batch below
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed(self, texts):
+        """Embeddings of `texts` as a (len(texts), 384) float32 array."""
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        # Similar lengths in the same batch: less padding to compute
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch])):
+                vectors[i] = vector
+        return np.stack(vectors).astype(np.float32)
+
+    def embed_documents(self, texts):
+        return self.embed(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+def export_model(output_dir=ONNX_MODEL_DIR, model_name=MODEL_NAME, quantize=True):
+    """Export the Hugging Face model to ONNX (and an int8 copy) with its tokenizer."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    print(f"Exporting {model_name} to {output_dir / FP32_FILE}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            str(output_dir / FP32_FILE),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"Quantizing to {output_dir / INT8_FILE}...")
+        quantize_dynamic(str(output_dir / FP32_FILE), str(output_dir / INT8_FILE), weight_type=QuantType.QInt8)
+    print("Done.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--export", action="store_true", help="export (and quantize) the model")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    if args.export:
+        export_model(args.output, quantize=not args.no_quantize)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
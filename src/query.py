@@ -1,12 +1,16 @@
-from langchain_huggingface import HuggingFaceEmbeddings  # <-- LOCAL Embeddings
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import ChatOllama               # <-- LOCAL LLM
-from langchain_classic.chains import RetrievalQA
-from langchain_core.prompts import PromptTemplate
 from .run_groq import groq_moderate_prompt
-import random
+from .preclassifier import preclassifier
+from concurrent.futures import ThreadPoolExecutor
+from db.metrics import timed
+from config import GENERATION_CONCURRENCY, WARMUP_EMBEDDINGS, SPECULATIVE_GENERATION, SPECULATIVE_RETRIEVAL
+from config import STREAMING_MODE, GENERATION_STRATEGY, EMBEDDINGS_BACKEND
+import asyncio
 import json
+import random
+import re
 import os
+import threading
+import time
 
 # Path to Pangea folder
 """PANGEA_PATH = os.path.join(
@@ -17,26 +21,118 @@ import os
 sys.path.append(PANGEA_PATH)"""
 
 from .discriminator import moderate_multiple_texts
+from .jsonl_log import JsonlWriter
+from .retrieval import Retriever, get_search_ef, set_search_ef
+from .semantic_cache import SemanticCache, vector_store_version
+from .streaming import stream_answer
+from config import ANSWERS_LOG_PATH
+from config import RETRIEVAL_HNSW_EF
 
 # --- 1. Configuration ---
 VECTOR_STORE_PATH = "./chroma_db"
-EMBEDDINGS_MODEL = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
-LLM = ChatOllama(model="llama3.1:8b", temperature=0.7)
-
-if not os.path.exists(VECTOR_STORE_PATH):
-    print(f"Error: Vector store not found at {VECTOR_STORE_PATH}")
-    print("Please run main.py first to create the database.")
-    exit()
-
-# --- 2. Connect to the Existing Local Database ---
-print(f"Connecting to existing vector store at: {VECTOR_STORE_PATH}...")
-docsearch = Chroma(
-    persist_directory=VECTOR_STORE_PATH,
-    embedding_function=EMBEDDINGS_MODEL  # Use the same embedder
-)
-print("Connected.")
+EMBEDDINGS_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+LLM_MODEL_NAME = "llama3.1:8b"
+
+# Heavy resources (embedding model, Chroma, Ollama clients, chains) are
+# created on first use by the get_* accessors below, not at import time.
+_resources = {}
+# One lock per resource: loading the embedding model must not block a
+# caller that only needs the LLM (or the REPL itself)
+_resource_locks = {}
+_resources_lock = threading.Lock()
+
+
+def _resource_lock(name):
+    with _resources_lock:
+        return _resource_locks.setdefault(name, threading.RLock())
+
+
+def _lazy(name, factory):
+    resource = _resources.get(name)
+    if resource is None:
+        with _resource_lock(name):
+            resource = _resources.get(name)
+            if resource is None:
+                resource = _resources[name] = factory()
+    return resource
+
+
+def override_resource(name, resource):
+    """Replace a lazily created resource (e.g. "llm", "retriever") with another object."""
+    with _resource_lock(name):
+        _resources[name] = resource
+
+
+def _create_embeddings():
+    if EMBEDDINGS_BACKEND == "onnx":
+        # Same model, exported to int8 ONNX: no PyTorch import, faster on CPU
+        from .onnx_embeddings import OnnxEmbeddings
+        embeddings = OnnxEmbeddings()
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings  # <-- LOCAL Embeddings
+        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL_NAME)
+    # Reuse the loaded MiniLM model for the local moderation fast path
+    preclassifier.set_embeddings(embeddings)
+    return embeddings
+
+
+def _create_llm():
+    from langchain_ollama import ChatOllama  # <-- LOCAL LLM
+    return ChatOllama(model=LLM_MODEL_NAME, temperature=0.7)
+
+
+def _create_docsearch():
+    from langchain_community.vectorstores import Chroma
+
+    if not os.path.exists(VECTOR_STORE_PATH):
+        raise FileNotFoundError(
+            f"Vector store not found at {VECTOR_STORE_PATH}. "
+            "Please run `python -m src.ingest` first to create the database."
+        )
+
+    # --- 2. Connect to the Existing Local Database ---
+    print(f"Connecting to existing vector store at: {VECTOR_STORE_PATH}...")
+    docsearch = Chroma(
+        persist_directory=VECTOR_STORE_PATH,
+        embedding_function=get_embeddings()  # Use the same embedder
+    )
+    print("Connected.")
+    return docsearch
+
+
+def get_embeddings():
+    return _lazy("embeddings", _create_embeddings)
+
+
+def get_llm():
+    return _lazy("llm", _create_llm)
+
+
+def get_pure_llm():
+    return _lazy("pure_llm", _create_llm)
+
+
+def get_docsearch():
+    return _lazy("docsearch", _create_docsearch)
+
+
+def warm_up(background=True):
+    """
+    Load the embedding model (and run one embedding) ahead of the first query.
+
+    With background=True this runs in a daemon thread and returns it, so
+    the REPL can start reading input while the model loads.
+    """
+    def _warm():
+        get_embeddings().embed_query("warm up")
+
+    if not background:
+        _warm()
+        return None
+    thread = threading.Thread(target=_warm, name="embeddings-warmup", daemon=True)
+    thread.start()
+    return thread
+
 
 # Define the Multi-Proposal Prompt
 multi_proposal_template = """
@@ -56,46 +152,87 @@ Answer 8:
 Answer 9:
 Answer 10:
 """
-PROMPT = PromptTemplate(
-    template=multi_proposal_template,
-    input_variables=["context", "question"]
-)
 
 # making a different prompt for the pure llm
 general_chat_template = """
-Provide 10 different possible answers to the user's message.
+Provide {n} different possible answers to the user's message.
+Each answer must use the tone given for it below. Make every answer unique,
+different, and avoid generic responses. Do NOT say you are an AI model.
+
+Tones:
+{styles}
 
 User input: {question}
 
-Answer 1:
-Answer 2:
-Answer 3:
-Answer 4:
-Answer 5:
-Answer 6:
-Answer 7:
-Answer 8:
-Answer 9:
-Answer 10:
+Return ONLY a JSON object of the form
+{{"answers": [{{"style": "<tone>", "answer": "<answer text>"}}, ...]}}
+with exactly {n} answers, in the order of the tones above.
 """
-GENERAL_CHAT_PROMPT = PromptTemplate(
-    template=general_chat_template,
-    input_variables=["question"]
-)
 
 
-def generate_multiple_answers(llm, question, n=10):
-    answers = []
-
-    for i in range(n):
-        style = random.choice([
-            "formal", "funny", "sarcastic", "childlike", "professional",
-            "poetic", "robotic", "friendly", "short", "long and detailed",
-            "grumpy but non-abusive", "rude", "annoyed tone",
-            "aggressively mean", "mocking"
-        ])
-
-        prompt = f"""
+def multi_answer_schema(n):
+    """JSON schema passed to Ollama to constrain the single-call output."""
+    return {
+        "type": "object",
+        "properties": {
+            "answers": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "style": {"type": "string"},
+                        "answer": {"type": "string"},
+                    },
+                    "required": ["style", "answer"],
+                },
+                "minItems": n,
+                "maxItems": n,
+            }
+        },
+        "required": ["answers"],
+    }
+
+
+def parse_multi_answers(text):
+    """
+    Split a single-call generation into a list of answer strings.
+
+    Accepts the JSON contract of general_chat_template (also when wrapped
+    in prose or code fences) and falls back to the legacy
+    "Answer 1: ... Answer 2: ..." layout.
+    """
+    candidates = [text]
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        items = data.get("answers", []) if isinstance(data, dict) else data
+        if isinstance(items, list):
+            answers = [
+                (item.get("answer") if isinstance(item, dict) else item)
+                for item in items
+            ]
+            return [a.strip() for a in answers if isinstance(a, str) and a.strip()]
+
+    parts = re.split(r"(?im)^\s*\**answer\s*\d+\**\s*[:.)-]\**", text)
+    return [part.strip() for part in parts[1:] if part.strip()]
+
+
+ANSWER_STYLES = [
+    "formal", "funny", "sarcastic", "childlike", "professional",
+    "poetic", "robotic", "friendly", "short", "long and detailed",
+    "grumpy but non-abusive", "rude", "annoyed tone",
+    "aggressively mean", "mocking"
+]
+
+
+def build_style_prompt(style, question):
+    return f"""
 Write ONE answer to the user's question below, using a **{style}** tone.
 Make it unique, different, and avoid generic responses.
 Do NOT say you are an AI model.
@@ -105,88 +242,488 @@ Question: {question}
 Answer:
 """
 
-        response = llm.invoke(prompt)
 
-        # Extract the text cleanly
-        answer_text = response.content.strip()
+def _generate_one(llm, prompt, stream=False, label=""):
+    """
+    Run one generation and return (answer_text, elapsed_seconds, aborted, verdict).
+
+    `verdict` is the streaming moderation verdict of the whole answer, or
+    None when it was not moderated while generated. For an aborted answer,
+    answer_text is the text generated up to the check that flagged it.
+    """
+    start = time.perf_counter()
+    if stream:
+        # Safe text is printed as it is moderated; flagged answers stop early
+        result = stream_answer(llm, prompt, on_text=lambda text: print(f"{label}{text}", flush=True))
+        if result["aborted"]:
+            print(f"{label}✂️ generation stopped after {result['checks']} checks (flagged by moderation)")
+            return result["flagged_text"], time.perf_counter() - start, True, result["verdict"]
+        return result["text"], time.perf_counter() - start, False, result["verdict"]
+
+    response = llm.invoke(prompt)
+    # Extract the text cleanly
+    answer_text = response.content.strip()
+    return answer_text, time.perf_counter() - start, False, None
+
+
+@timed("generate_multiple_answers")
+def generate_multiple_answers(llm, question, n=10, concurrency=GENERATION_CONCURRENCY,
+                              return_timings=False, stream=STREAMING_MODE, return_verdicts=False):
+    """
+    Generate n answers, each in a randomly chosen style.
+
+    Up to `concurrency` generations run in parallel (Ollama serves them
+    concurrently); concurrency=1 keeps the old one-after-another behaviour.
+    Answers are always returned in the order of the chosen styles.
+
+    With `stream`, each answer is moderated while it is generated (see
+    src/streaming.py): safe text is printed as it arrives and answers
+    flagged mid-generation are aborted and left out of the answers.
+    return_verdicts also returns the streaming verdict of each kept answer
+    (None when not streamed), for moderate_multiple_texts(verdicts=...),
+    and the aborted answers as (flagged text, verdict) pairs.
+    """
+    # Styles are drawn up front so the selection does not depend on scheduling
+    styles = [random.choice(ANSWER_STYLES) for _ in range(n)]
+    prompts = [build_style_prompt(style, question) for style in styles]
+    labels = [f"[{i}] " for i in range(1, n + 1)]
+
+    def run(args):
+        prompt, label = args
+        return _generate_one(llm, prompt, stream=stream, label=label)
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        results = [run(args) for args in zip(prompts, labels)]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, n))) as pool:
+            # map() yields results in submission order
+            results = list(pool.map(run, zip(prompts, labels)))
+    total = time.perf_counter() - start
+
+    for i, (style, (_, elapsed, aborted, _)) in enumerate(zip(styles, results), 1):
+        print(f"⏱️ Answer {i} ({style}): {elapsed:.2f}s" + (" [aborted]" if aborted else ""))
+    print(f"⏱️ {n} answers in {total:.2f}s (concurrency={concurrency})")
+
+    kept = [(text, elapsed, verdict) for text, elapsed, aborted, verdict in results if not aborted]
+    answers = [text for text, _, _ in kept]
+    timings = [elapsed for _, elapsed, _ in kept]
+    verdicts = [verdict for _, _, verdict in kept]
+    aborted = [(text, verdict) for text, _, was_aborted, verdict in results if was_aborted]
+
+    extras = ([timings] if return_timings else []) + ([verdicts, aborted] if return_verdicts else [])
+    return (answers, *extras) if extras else answers
+
+
+@timed("generate_answers_single_call")
+def generate_answers_single_call(llm, question, n=10, return_timings=False):
+    """
+    Generate n styled answers with ONE LLM call (one prompt prefill).
+
+    `llm` should be the schema-constrained model from get_structured_llm(n).
+    Styles are drawn at random like in generate_multiple_answers; if the
+    output holds fewer than n answers, the missing ones are generated with
+    the per-answer path. Timings are the single call's duration, shared.
+    """
+    styles = [random.choice(ANSWER_STYLES) for _ in range(n)]
+    prompt = get_general_chat_prompt().format(
+        n=n,
+        styles="\n".join(f"{i}. {style}" for i, style in enumerate(styles, 1)),
+        question=question,
+    )
+
+    start = time.perf_counter()
+    response = llm.invoke(prompt)
+    answers = parse_multi_answers(response.content)[:n]
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {len(answers)}/{n} answers in one call: {elapsed:.2f}s")
+
+    timings = [elapsed] * len(answers)
+    if len(answers) < n:
+        print(f"⚠️ Only {len(answers)} answers parsed, generating {n - len(answers)} more one by one.")
+        missing, missing_timings = generate_multiple_answers(
+            get_pure_llm(), question, n=n - len(answers), return_timings=True, stream=False
+        )
+        answers += missing
+        timings += missing_timings
+
+    if return_timings:
+        return answers, timings
+    return answers
+
 
-        answers.append(answer_text)
+def generate_answers(question, n=10, strategy=GENERATION_STRATEGY, stream=STREAMING_MODE, return_verdicts=False):
+    """
+    General-chat entry point: n styled answers using the selected strategy.
 
-    return answers
+    "per_answer" runs one call per answer (generate_multiple_answers),
+    "single_call" asks for all n in one structured call (no streaming).
+    return_verdicts returns (answers, streaming verdicts or None per answer,
+    aborted (flagged text, verdict) pairs).
+    """
+    if strategy == "single_call":
+        answers = generate_answers_single_call(get_structured_llm(n), question, n=n)
+        return (answers, [None] * len(answers), []) if return_verdicts else answers
+    if strategy != "per_answer":
+        raise ValueError(f"Unknown generation strategy: {strategy!r}")
+    return generate_multiple_answers(get_pure_llm(), question, n=n, stream=stream, return_verdicts=return_verdicts)
 
 
 # --- 3. Build the RAG Chain ---
-print("Building RAG chain with Ollama...")
-qa_chain = RetrievalQA.from_chain_type(
-    llm=LLM,
-    chain_type="stuff",
-    retriever=docsearch.as_retriever(),
-    chain_type_kwargs={"prompt": PROMPT},
-    return_source_documents=False,
-    input_key="question"
-)
-print("\n--- RAG (100% Local) is Ready ---")
+def _create_qa_chain():
+    from langchain_classic.chains import RetrievalQA
+
+    print("Building RAG chain with Ollama...")
+    qa_chain = RetrievalQA.from_chain_type(
+        llm=get_llm(),
+        chain_type="stuff",
+        retriever=get_retriever().as_langchain(),
+        chain_type_kwargs={"prompt": get_prompt()},
+        return_source_documents=False,
+        input_key="question"
+    )
+    print("\n--- RAG (100% Local) is Ready ---")
+    return qa_chain
+
+
+def _create_retriever():
+    # k / MMR / score cutoff / ef_search come from the RETRIEVAL_* settings
+    docsearch = get_docsearch()
+    # ef_search is persisted in the collection configuration: only written when asked for
+    if RETRIEVAL_HNSW_EF and get_search_ef(docsearch) != RETRIEVAL_HNSW_EF:
+        set_search_ef(docsearch, RETRIEVAL_HNSW_EF)
+    return Retriever(
+        docsearch,
+        get_embeddings(),
+        version_fn=lambda: vector_store_version(VECTOR_STORE_PATH)
+    )
+
+
+def get_retriever():
+    return _lazy("retriever", _create_retriever)
+
+
+@timed("rag_retrieval")
+def retrieve(query, vector=None):
+    return get_retriever().invoke(query, vector=vector)
+
+
+@timed("rag_generation")
+def generate_rag_answer(query, docs):
+    """Run only the generation half of the RAG chain on already-retrieved docs."""
+    output = get_qa_chain().combine_documents_chain.invoke({"input_documents": docs, "question": query})
+    return {"question": query, "result": output["output_text"]}
+
+
+@timed("rag_generation")
+def stream_rag_answer(query, docs, on_text=None):
+    """Generate the RAG answer token by token with incremental moderation."""
+    prompt = get_prompt().format(
+        context="\n\n".join(doc.page_content for doc in docs),
+        question=query,
+    )
+    result = stream_answer(get_llm(), prompt, on_text=on_text)
+    return {"question": query, "result": result["text"], "aborted": result["aborted"]}
+
+
+def _create_prompt():
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate(
+        template=multi_proposal_template,
+        input_variables=["context", "question"]
+    )
+
+
+def _create_general_chat_prompt():
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate(
+        template=general_chat_template,
+        input_variables=["n", "styles", "question"]
+    )
+
+
+def _create_answer_cache():
+    # Near-identical questions are served from here instead of re-running the chain
+    return SemanticCache(
+        get_embeddings(),
+        version_fn=lambda: vector_store_version(VECTOR_STORE_PATH)
+    )
 
-pure_llm = ChatOllama(model="llama3.1:8b", temperature=0.7)
 
-print("\n--- RAG (Hybrid Mode) is Ready ---")
-print("Type '/toggle' to switch between RAG and General Chat.")
-print("Type 'exit' to quit.\n")
+def get_prompt():
+    return _lazy("prompt", _create_prompt)
 
-rag_mode_on = True
 
-# the general chain
-general_chain = GENERAL_CHAT_PROMPT | pure_llm
+def get_general_chat_prompt():
+    return _lazy("general_chat_prompt", _create_general_chat_prompt)
 
-all_generated_answers = []
-# --- 4. Start the Question Loop ---
-while True:
-    # Visual cue for the user
-    mode_label = "[ RAG]" if rag_mode_on else "[💬 GENERAL CHAT]"
-    query = input(f"\n{mode_label} Enter question: ")
 
-    mod = groq_moderate_prompt(query)
+def get_structured_llm(n=10):
+    """ChatOllama constrained to the multi-answer JSON schema for n answers."""
+    def create():
+        from langchain_ollama import ChatOllama
+        return ChatOllama(model=LLM_MODEL_NAME, temperature=0.7, format=multi_answer_schema(n))
+    return _lazy(f"structured_llm_{n}", create)
 
-    while mod["violation"] == 1:
-        print("\n❌ Question refused due to policy violation.")
-        print(f"Category: {mod.get('category')}")
-        print(f"Rationale: {mod.get('rationale')}")
-        query = input("\nEnter a new question: ")
-        mod = groq_moderate_prompt(query)
 
-    if query.lower() == 'exit':
-        print("Goodbye!")
-        break
+def get_qa_chain():
+    return _lazy("qa_chain", _create_qa_chain)
+
+
+def get_general_chain():
+    # the general chain
+    return _lazy("general_chain", lambda: get_general_chat_prompt() | get_structured_llm())
+
+
+def get_answer_cache():
+    return _lazy("answer_cache", _create_answer_cache)
+
+
+# Old module-level names, resolved lazily (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "EMBEDDINGS_MODEL": get_embeddings,
+    "LLM": get_llm,
+    "pure_llm": get_pure_llm,
+    "docsearch": get_docsearch,
+    "PROMPT": get_prompt,
+    "GENERAL_CHAT_PROMPT": get_general_chat_prompt,
+    "retriever": get_retriever,
+    "qa_chain": get_qa_chain,
+    "general_chain": get_general_chain,
+    "answer_cache": get_answer_cache,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+COMMANDS = ("exit", "/toggle")
+
+# Dedicated pool: asyncio.run() waits for its default executor on exit, which
+# would make a rejected prompt wait for its discarded speculative work
+_speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative")
+
+
+def _in_pool(func, *args):
+    return asyncio.get_running_loop().run_in_executor(_speculation_pool, func, *args)
+
+
+def _cached_or_retrieve(query):
+    answer_cache = get_answer_cache()
+    cached = answer_cache.lookup(query)
+    if cached is not None:
+        return {"cached": cached, "docs": None, "response": None}
+    # Same question, same vector: the cache lookup already embedded it
+    return {"cached": None, "docs": retrieve(query, answer_cache.embedding(query)), "response": None}
+
+
+async def _speculate_rag(query, generate):
+    result = await _in_pool(_cached_or_retrieve, query)
+    if generate and result["cached"] is None:
+        # Sync invoke in the pool: asyncio.run() gives every REPL turn a new
+        # loop, and the cached ChatOllama's async client stays bound to the first
+        result["response"] = await _in_pool(generate_rag_answer, query, result["docs"])
+    return result
+
+
+async def moderate_with_speculation(query, rag_mode_on, retrieve=SPECULATIVE_RETRIEVAL,
+                                    generate=SPECULATIVE_GENERATION):
+    """
+    Run groq_moderate_prompt while the answer pipeline starts speculatively.
+
+    In RAG mode the semantic-cache lookup and Chroma retrieval (and, with
+    `generate`, the answer itself) run alongside moderation; in general
+    chat only `generate` has anything to start. Returns (mod, speculative):
+    speculative is None unless the prompt was accepted and the speculative
+    work succeeded. Nothing speculative is printed before the verdict, and
+    on a rejection the work is cancelled and discarded (a thread already
+    running a blocking call finishes in the background, its result unused).
+    """
+    speculation = None
+    if rag_mode_on and (retrieve or generate):
+        speculation = asyncio.create_task(_speculate_rag(query, generate))
+    elif not rag_mode_on and generate:
+        speculation = asyncio.ensure_future(
+            # never streamed: nothing may be printed before the verdict
+            _in_pool(lambda: generate_answers(query, 10, stream=False))
+        )
+
+    try:
+        mod = await _in_pool(groq_moderate_prompt, query)
+    except BaseException:
+        if speculation is not None:
+            speculation.cancel()
+        raise
+
+    if speculation is None:
+        return mod, None
+
+    if mod["violation"] == 1:
+        speculation.cancel()
+        try:
+            await speculation
+        except BaseException:
+            pass
+        return mod, None
 
-    if query.lower() == '/toggle':
-        rag_mode_on = not rag_mode_on
-        state = "ENABLED" if rag_mode_on else "DISABLED"
-        print(f"*** RAG Mode is now {state} ***")
-        continue
     try:
-        print("Thinking...")
-
-        if rag_mode_on:
-            # Use the RAG pipeline with the 10-answer format
-            response = qa_chain.invoke({"question": query})
-            print("\n--- 10 Distinct Proposals (Based on Data) ---")
-            print(response['result'])
-        else:
-            # GENERAL CHAT MODE — 10 independent answers
-            answers = generate_multiple_answers(pure_llm, query, n=10)
-
-            all_generated_answers.append(answers)
-
-            print("\n--- 10 Diverse Answers ---")
-            for i, ans in enumerate(answers, 1):
-                print(f"{i}. {ans}")
-
-            # Moderation step
-            with open("answers_log.json", "w") as f:
-                json.dump(all_generated_answers, f, indent=4)
-
-                # Moderate all generated answers
-                for answers in all_generated_answers:
-                    moderation_results = moderate_multiple_texts(answers)
+        return mod, await speculation
     except Exception as e:
-        print(f"An error occurred: {e}")
+        # The normal (non-speculative) path will redo the work
+        print(f"⚠️ Speculative work failed, retrying normally: {e}")
+        return mod, None
+
+
+def answer_rag(query, speculative=None, stream=STREAMING_MODE):
+    """
+    Produce the RAG answer, reusing speculative work when there is some.
+
+    Returns (response, shown): shown is True when the answer was already
+    streamed to the terminal; response is None if streaming moderation
+    aborted the generation.
+    """
+    answer_cache = get_answer_cache()
+    if speculative is not None:
+        cached, docs, response = speculative["cached"], speculative["docs"], speculative["response"]
+    else:
+        cached, docs, response = answer_cache.lookup(query), None, None
+
+    if cached is not None:
+        print("⚡ Served from the semantic answer cache.")
+        return cached, False
+
+    if response is not None:
+        answer_cache.store(query, response)
+        return response, False
+
+    if docs is None:
+        docs = retrieve(query, answer_cache.embedding(query))
+
+    if not stream:
+        response = generate_rag_answer(query, docs)
+        answer_cache.store(query, response)
+        return response, False
+
+    print("\n--- 10 Distinct Proposals (Based on Data) ---")
+    response = stream_rag_answer(query, docs, on_text=lambda text: print(text, end="", flush=True))
+    print()
+    if response["aborted"]:
+        print("✂️ Answer stopped: the generated text was flagged by moderation.")
+        return None, True
+    answer_cache.store(query, response)
+    return response, True
+
+
+def moderate(query, rag_mode_on):
+    """Moderate a REPL input, with speculation for real questions."""
+    if query.lower() in COMMANDS or not (SPECULATIVE_RETRIEVAL or SPECULATIVE_GENERATION):
+        return groq_moderate_prompt(query), None
+    return asyncio.run(moderate_with_speculation(query, rag_mode_on))
+
+
+def main():
+    if WARMUP_EMBEDDINGS:
+        warm_up(background=True)
+
+    # Only check that the store exists: opening Chroma would wait for the
+    # embedding model that warm_up is loading in the background
+    if not os.path.exists(VECTOR_STORE_PATH):
+        print(f"Error: Vector store not found at {VECTOR_STORE_PATH}. "
+              "Please run `python -m src.ingest` first to create the database.")
+        return
+
+    print("\n--- RAG (Hybrid Mode) is Ready ---")
+    print("Type '/toggle' to switch between RAG and General Chat.")
+    print("Type 'exit' to quit.\n")
+
+    rag_mode_on = True
+
+    # Append-only: one line per turn instead of rewriting the whole history
+    answers_log = JsonlWriter(ANSWERS_LOG_PATH)
+    # One entry per general-chat turn, so each batch is moderated exactly once
+    session_batches = []
+    # --- 4. Start the Question Loop ---
+    while True:
+        # Visual cue for the user
+        mode_label = "[ RAG]" if rag_mode_on else "[💬 GENERAL CHAT]"
+        query = input(f"\n{mode_label} Enter question: ")
+
+        mod, speculative = moderate(query, rag_mode_on)
+
+        while mod["violation"] == 1:
+            print("\n❌ Question refused due to policy violation.")
+            print(f"Category: {mod.get('category')}")
+            print(f"Rationale: {mod.get('rationale')}")
+            query = input("\nEnter a new question: ")
+            mod, speculative = moderate(query, rag_mode_on)
+
+        if query.lower() == 'exit':
+            print("Goodbye!")
+            break
+
+        if query.lower() == '/toggle':
+            rag_mode_on = not rag_mode_on
+            state = "ENABLED" if rag_mode_on else "DISABLED"
+            print(f"*** RAG Mode is now {state} ***")
+            continue
+        try:
+            print("Thinking...")
+
+            if rag_mode_on:
+                # Use the RAG pipeline with the 10-answer format
+                response, shown = answer_rag(query, speculative)
+                if response is not None and not shown:
+                    print("\n--- 10 Distinct Proposals (Based on Data) ---")
+                    print(response['result'])
+            else:
+                # GENERAL CHAT MODE — 10 independent answers
+                if speculative:
+                    answers, verdicts, aborted = speculative, [None] * len(speculative), []
+                else:
+                    # Streamed answers come with their moderation verdicts
+                    answers, verdicts, aborted = generate_answers(query, n=10, return_verdicts=True)
+                # Streamed answers were already printed as they were generated
+                streamed = not speculative and STREAMING_MODE and GENERATION_STRATEGY == "per_answer"
+
+                session_batches.append({
+                    "prompt": query,
+                    "answers": answers,
+                    "verdicts": verdicts,
+                    # Stopped answers are still recorded, with the verdict that flagged them
+                    "aborted": aborted,
+                    "row_ids": mod.get("row_ids"),
+                    "moderated": False,
+                })
+
+                if not answers:
+                    print("\n✂️ Every answer was stopped by moderation.")
+                else:
+                    print(f"\n--- {len(answers)} Diverse Answers ---")
+                    if not streamed:
+                        for i, ans in enumerate(answers, 1):
+                            print(f"{i}. {ans}")
+
+                answers_log.append({"prompt": query, "answers": answers,
+                                    "aborted": [text for text, _ in aborted]})
+
+                # Moderation step: only batches not moderated yet (normally just
+                # this turn's, plus any batch whose moderation failed earlier)
+                for batch in session_batches:
+                    if batch["moderated"]:
+                        continue
+                    texts = batch["answers"] + [text for text, _ in batch["aborted"]]
+                    if texts:
+                        moderate_multiple_texts(
+                            texts, prompt=batch["prompt"], row_ids=batch["row_ids"],
+                            verdicts=batch["verdicts"] + [verdict for _, verdict in batch["aborted"]],
+                        )
+                    batch["moderated"] = True
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+
+if __name__ == "__main__":
+    main()
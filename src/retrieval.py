@@ -0,0 +1,144 @@
+"""
+Configurable Chroma retriever with a cache of retrieval results.
+
+The question is embedded once, then searched by vector with either plain
+similarity (optionally dropping documents under a relevance cutoff) or MMR
+(fetch_k candidates re-ranked for diversity with lambda_mult). Results are
+kept in an LRU keyed on the hash of the query embedding, the search
+settings and the collection version, so a repeated question skips the
+HNSW search until the vector store changes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_FETCH_K,
+    RETRIEVAL_K,
+    RETRIEVAL_MMR_LAMBDA,
+    RETRIEVAL_SCORE_THRESHOLD,
+    RETRIEVAL_SEARCH_TYPE,
+)
+
+# Chroma's ef_search when the collection configuration does not set one
+DEFAULT_SEARCH_EF = 100
+
+
+def get_search_ef(docsearch):
+    """Current HNSW ef_search of the collection, or None if unknown."""
+    try:
+        configuration = docsearch._collection.configuration or {}
+        return (configuration.get("hnsw") or {}).get("ef_search")
+    except Exception:
+        return None
+
+
+def set_search_ef(docsearch, ef):
+    """
+    Set the HNSW ef_search of the collection (higher = better recall, slower).
+
+    Stored in the collection configuration, so it persists across runs:
+    callers apply it explicitly (see query._create_retriever).
+    """
+    try:
+        docsearch._collection.modify(configuration={"hnsw": {"ef_search": int(ef)}})
+        return True
+    except Exception as e:
+        print("⚠️ Could not set HNSW ef_search:", e)
+        return False
+
+
+class Retriever:
+    """
+    invoke(question) -> list of Documents, like a LangChain retriever.
+    Pass vector= when the question is already embedded (e.g. by the semantic
+    answer cache) to skip embedding it again.
+
+    search_type is "similarity" or "mmr"; score_threshold (0-1 relevance,
+    similarity only) drops weak matches; cache_size=0 disables the cache.
+    """
+
+    def __init__(self, docsearch, embeddings, k=RETRIEVAL_K, fetch_k=RETRIEVAL_FETCH_K,
+                 search_type=RETRIEVAL_SEARCH_TYPE, lambda_mult=RETRIEVAL_MMR_LAMBDA,
+                 score_threshold=RETRIEVAL_SCORE_THRESHOLD, cache_size=RETRIEVAL_CACHE_SIZE,
+                 version_fn=None):
+        if search_type not in ("similarity", "mmr"):
+            raise ValueError(f"Unknown search_type {search_type!r}: expected 'similarity' or 'mmr'.")
+        self.docsearch = docsearch
+        self.embeddings = embeddings
+        self.k = k
+        self.fetch_k = max(fetch_k, k)
+        self.search_type = search_type
+        self.lambda_mult = lambda_mult
+        self.score_threshold = score_threshold
+        self.cache_size = cache_size
+        self.version_fn = version_fn
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _settings(self):
+        return f"{self.search_type}:{self.k}:{self.fetch_k}:{self.lambda_mult}:{self.score_threshold}"
+
+    def _key(self, vector):
+        version = self.version_fn() if self.version_fn else None
+        digest = hashlib.sha256(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+        return f"{digest}:{self._settings()}:{version}"
+
+    def search(self, vector):
+        """Run the configured search for an already-embedded question."""
+        if self.search_type == "mmr":
+            return self.docsearch.max_marginal_relevance_search_by_vector(
+                vector, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
+        if not self.score_threshold:
+            return self.docsearch.similarity_search_by_vector(vector, k=self.k)
+
+        # Chroma returns distances: convert them to 0-1 relevance like the
+        # "similarity_score_threshold" retriever does
+        relevance = self.docsearch._select_relevance_score_fn()
+        results = self.docsearch.similarity_search_by_vector_with_relevance_scores(vector, k=self.k)
+        return [doc for doc, distance in results if relevance(distance) >= self.score_threshold]
+
+    def invoke(self, question, *args, vector=None, **kwargs):
+        if vector is None:
+            vector = self.embeddings.embed_query(question)
+        if not self.cache_size:
+            return self.search(vector)
+
+        key = self._key(vector)
+        with self._lock:
+            docs = self._cache.get(key)
+            if docs is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(docs)
+            self.misses += 1
+
+        docs = self.search(vector)
+        with self._lock:
+            self._cache[key] = docs
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(docs)
+
+    def as_langchain(self):
+        """This retriever as a LangChain BaseRetriever (for RetrievalQA)."""
+        from langchain_core.retrievers import BaseRetriever
+
+        retriever = self
+
+        class _LangChainRetriever(BaseRetriever):
+            def _get_relevant_documents(self, query, *, run_manager):
+                return retriever.invoke(query)
+
+        return _LangChainRetriever()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL
+
+
+def vector_store_version(path):
+    """
+    Cheap fingerprint of a persisted Chroma store.
+
+    Any write to the collection touches chroma.sqlite3, so its size and
+    mtime change whenever documents are added, updated or deleted.
+    """
+    try:
+        stat = os.stat(os.path.join(path, "chroma.sqlite3"))
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class SemanticCache:
+    """
+    Cache of RAG results keyed on question embeddings.
+
+    lookup() embeds the question with the given LangChain embeddings and
+    returns the result of the most similar cached question when its cosine
+    similarity is at least `threshold`. Entries are evicted LRU-first above
+    `max_entries` and expire after `ttl` seconds. When `version_fn` is given,
+    the whole cache is dropped as soon as its return value changes (e.g.
+    vector_store_version of the Chroma directory).
+    """
+
+    def __init__(self, embeddings, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_SIZE,
+                 ttl=SEMANTIC_CACHE_TTL, version_fn=None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_fn = version_fn
+        self._version = version_fn() if version_fn else None
+        # question -> (unit vector, result, created_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # The question embedded by the last lookup, reused by store() and embedding()
+        self._last = (None, None, None)
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, question):
+        last = self._last
+        if last[0] != question:
+            embedding = self.embeddings.embed_query(question)
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector = vector / norm
+            last = self._last = (question, embedding, vector)
+        return last
+
+    def _embed(self, question):
+        return self._remember(question)[2]
+
+    def embedding(self, question):
+        """The raw embed_query vector of question, reusing the one lookup() computed."""
+        return self._remember(question)[1]
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+
+    def lookup(self, question):
+        """Return the cached result for a similar question, or None."""
+        vector = self._embed(question)
+        now = time.time()
+
+        with self._lock:
+            self._check_version()
+
+            expired = [q for q, (_, _, created_at) in self._entries.items() if now - created_at > self.ttl]
+            for q in expired:
+                del self._entries[q]
+
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            questions = list(self._entries)
+            matrix = np.stack([self._entries[q][0] for q in questions])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(questions[best])
+            self.hits += 1
+            return self._entries[questions[best]][1]
+
+    def store(self, question, result):
+        vector = self._embed(question)
+        with self._lock:
+            self._entries[question] = (vector, result, time.time())
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
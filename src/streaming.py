@@ -0,0 +1,121 @@
+import re
+
+from config import (
+    STREAM_ABORT_CATEGORIES,
+    STREAM_BATCH_WINDOW_MS,
+    STREAM_CHECK_MIN_CHARS,
+    STREAM_CHECK_OVERLAP,
+    STREAM_MAX_RISK,
+)
+from .batching import BackgroundBatcher
+from .discriminator import CATEGORIES, classify_texts
+
+# Checks from all concurrent streams share Mistral calls: one batch per window
+stream_classifier = BackgroundBatcher(classify_texts, window_ms=STREAM_BATCH_WINDOW_MS)
+
+# End of a sentence: punctuation followed by whitespace, or a line break
+SENTENCE_END = re.compile(r"[.!?…](?=\s)|\n")
+
+
+def _last_boundary(text):
+    """Index just after the last sentence end in text, or 0."""
+    end = 0
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+    return end
+
+
+def is_flagged(verdict, categories=STREAM_ABORT_CATEGORIES, max_risk=STREAM_MAX_RISK):
+    """True when a verdict should stop the generation: a harmful category, or too many flags overall."""
+    return any(verdict.get(name) for name in categories) or verdict["risk_score"] > max_risk
+
+
+def merge_verdicts(verdicts):
+    """One verdict for a whole answer from the verdicts of its segments."""
+    merged = {name: any(v.get(name) for v in verdicts) for name in CATEGORIES}
+    merged["risk_score"] = sum(merged.values())
+    return merged
+
+
+def stream_with_moderation(chunks, on_text=None, classify=stream_classifier,
+                           min_chars=STREAM_CHECK_MIN_CHARS, overlap=STREAM_CHECK_OVERLAP,
+                           categories=STREAM_ABORT_CATEGORIES, max_risk=STREAM_MAX_RISK):
+    """
+    Consume a token stream, moderating it incrementally.
+
+    Once enough new characters are pending (`min_chars`, then as much as
+    was already checked, so a long answer needs few checks), the new text
+    up to the last sentence boundary (or, past 4 x that amount without any
+    boundary, up to the current position) is moderated together with the
+    last `overlap` characters already checked. Text is only passed to
+    `on_text` after the check covering it came back safe. As soon as a
+    check flags one of `categories` or exceeds `max_risk`, the stream is
+    closed, which stops the generation.
+
+    The default `classify` batches the checks of every concurrent stream
+    into shared Mistral calls (see src/batching.py).
+
+    `chunks` may yield strings or LangChain message chunks (e.g. the
+    result of llm.stream(prompt)). Returns a dict with:
+      - "text": the text shown (only the checked part when aborted);
+      - "aborted" and "flags", the verdict of the check that stopped it;
+      - "flagged_text": everything generated up to that check;
+      - "verdict": the verdicts of every check merged, for the whole
+        answer (or the flagged text), reusable instead of moderating again;
+      - "checks": the number of moderation checks made.
+    """
+    text = ""
+    checked = 0
+    checks = 0
+    flagged = None
+    flagged_upto = 0
+    verdicts = []
+
+    def check(upto):
+        nonlocal checked, checks, flagged, flagged_upto
+        checks += 1
+        verdict = classify([text[max(0, checked - overlap):upto]])[0]
+        verdicts.append(verdict)
+        if is_flagged(verdict, categories, max_risk):
+            flagged, flagged_upto = verdict, upto
+            return False
+        if on_text is not None:
+            on_text(text[checked:upto])
+        checked = upto
+        return True
+
+    try:
+        for chunk in chunks:
+            text += getattr(chunk, "content", chunk)
+            pending = text[checked:]
+            step = max(min_chars, checked)
+            if len(pending) < step:
+                continue
+            boundary = _last_boundary(pending)
+            if not boundary and len(pending) >= 4 * step:
+                boundary = len(pending)
+            if boundary and not check(checked + boundary):
+                break
+        else:
+            if checked < len(text):
+                check(len(text))
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+    # Every character of the answer (or of the flagged text) has been checked
+    covered = flagged is not None or (verdicts and checked == len(text))
+    return {
+        "text": text.strip() if flagged is None else text[:checked].strip(),
+        "aborted": flagged is not None,
+        "flags": flagged,
+        "flagged_text": text[:flagged_upto].strip() if flagged is not None else None,
+        "verdict": merge_verdicts(verdicts) if covered else None,
+        "checks": checks,
+    }
+
+
+def stream_answer(llm, prompt, on_text=None, **kwargs):
+    """Stream one ChatOllama generation through stream_with_moderation."""
+    return stream_with_moderation(llm.stream(prompt), on_text=on_text, **kwargs)
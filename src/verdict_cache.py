@@ -0,0 +1,176 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config import VERDICT_CACHE_MAX_ROWS, VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL
+from db.database import (
+    CREATE_MODERATION_CACHE_INDEX_SQL,
+    CREATE_MODERATION_CACHE_SQL,
+    ensure_schema,
+    transaction,
+)
+
+# Run the SQLite size-based eviction once every N writes instead of on each put
+PRUNE_EVERY = 100
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivial variants (case, spacing) share a cache entry."""
+    text = unicodedata.normalize("NFKC", prompt or "")
+    return " ".join(text.casefold().split())
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """
+    Two-tier cache of moderation verdicts.
+
+    Tier 1 is an in-process LRU (OrderedDict), tier 2 is the
+    `moderation_cache` table in the SQLite database. Entries are keyed on
+    the normalized prompt, the policy text and the model name, so changing
+    the policy or the model never serves a stale verdict.
+    """
+
+    def __init__(self, max_entries=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL,
+                 max_rows=VERDICT_CACHE_MAX_ROWS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._policy_hashes = {}
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- keys ----------
+
+    def _policy_hash(self, policy_text: str) -> str:
+        # The policy is ~1.5k tokens: hash it once per distinct text
+        policy_hash = self._policy_hashes.get(policy_text)
+        if policy_hash is None:
+            policy_hash = _sha256(policy_text)
+            self._policy_hashes[policy_text] = policy_hash
+        return policy_hash
+
+    def make_key(self, prompt: str, policy_text: str, model: str) -> str:
+        prompt_hash = _sha256(normalize_prompt(prompt))
+        return _sha256(f"{model}\0{self._policy_hash(policy_text)}\0{prompt_hash}")
+
+    # ---------- SQLite tier ----------
+
+    def _db_get(self, key: str, now: float):
+        ensure_schema("moderation_cache", CREATE_MODERATION_CACHE_SQL, CREATE_MODERATION_CACHE_INDEX_SQL)
+        with transaction() as conn:
+            row = conn.execute(
+                "SELECT result, created_at FROM moderation_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            result_json, created_at = row
+            if now - created_at > self.ttl:
+                conn.execute("DELETE FROM moderation_cache WHERE cache_key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE moderation_cache SET last_hit_at = ? WHERE cache_key = ?",
+                (now, key),
+            )
+            return created_at, json.loads(result_json)
+
+    def _db_put(self, key: str, model: str, policy_hash: str, result: dict, now: float):
+        ensure_schema("moderation_cache", CREATE_MODERATION_CACHE_SQL, CREATE_MODERATION_CACHE_INDEX_SQL)
+        with transaction() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO moderation_cache
+                    (cache_key, model, policy_hash, result, created_at, last_hit_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, model, policy_hash, json.dumps(result, ensure_ascii=False), now, now),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._db_prune(conn, now)
+
+    def _db_prune(self, conn, now: float):
+        """Drop expired rows, then the least recently hit rows above max_rows."""
+        conn.execute("DELETE FROM moderation_cache WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            """
+            DELETE FROM moderation_cache
+            WHERE cache_key IN (
+                SELECT cache_key FROM moderation_cache
+                ORDER BY last_hit_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_rows,),
+        )
+
+    # ---------- public API ----------
+
+    def get(self, prompt: str, policy_text: str, model: str):
+        """Return a copy of the cached verdict, or None on a miss."""
+        key = self.make_key(prompt, policy_text, model)
+        now = time.time()
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                created_at, result = entry
+                if now - created_at <= self.ttl:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                del self._lru[key]
+
+        try:
+            entry = self._db_get(key, now)
+        except sqlite3.Error as e:
+            print("⚠️ Verdict cache lookup failed:", e)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._lru_store(key, entry)
+            self.hits += 1
+        return dict(entry[1])
+
+    def put(self, prompt: str, policy_text: str, model: str, result: dict):
+        key = self.make_key(prompt, policy_text, model)
+        now = time.time()
+
+        with self._lock:
+            self._lru_store(key, (now, dict(result)))
+
+        try:
+            self._db_put(key, model, self._policy_hash(policy_text), result, now)
+        except sqlite3.Error as e:
+            print("⚠️ Verdict cache write failed:", e)
+
+    def clear(self):
+        """Empty both tiers."""
+        with self._lock:
+            self._lru.clear()
+        ensure_schema("moderation_cache", CREATE_MODERATION_CACHE_SQL, CREATE_MODERATION_CACHE_INDEX_SQL)
+        with transaction() as conn:
+            conn.execute("DELETE FROM moderation_cache")
+
+    def _lru_store(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+
+verdict_cache = VerdictCache()
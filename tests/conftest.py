@@ -0,0 +1,38 @@
+import contextlib
+import io
+
+import pytest
+
+import db.database
+import db.init_db
+import db.metrics
+
+
+def _init_database(monkeypatch, path):
+    """Point the db layer at a fresh, initialized SQLite file."""
+    db.database.close_connections()
+    monkeypatch.setattr(db.database, "DATABASE_PATH", path)
+    monkeypatch.setattr(db.init_db, "DATABASE_PATH", path)
+    monkeypatch.setattr(db.init_db, "DATA_DIR", path.parent)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.init_db.init_database()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _session_database(tmp_path_factory):
+    # Nothing the tests write (metrics flushed at exit included) may land in data/database.db
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        _init_database(monkeypatch, tmp_path_factory.mktemp("db") / "session.db")
+        yield
+        db.metrics.flush()
+        db.database.close_connections()
+
+
+@pytest.fixture
+def temp_database(tmp_path, monkeypatch):
+    """An empty database of its own for one test."""
+    path = tmp_path / "test.db"
+    _init_database(monkeypatch, path)
+    yield path
+    db.metrics.flush()
+    db.database.close_connections()
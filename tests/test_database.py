@@ -0,0 +1,165 @@
+import contextlib
+import io
+import threading
+
+import pytest
+
+from db import database, rollups
+from db.database import FLAG_COLUMNS, decode_flags, flags_bitmask
+import src.discriminator as discriminator
+from src.jsonl_log import JsonlWriter
+
+
+def verdict(*flagged):
+    result = {name: name in flagged for name in FLAG_COLUMNS}
+    result["risk_score"] = len(flagged)
+    return result
+
+
+def rows(*columns, table="moderation_results"):
+    cur = database.shared_connection().execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+    return cur.fetchall()
+
+
+# ---------- contiguous ids ----------
+
+def test_save_prompts_returns_the_inserted_ids(temp_database):
+    first = database.save_prompt("before")
+    ids = database.save_prompts("question", count=3)
+
+    assert ids == [first + 1, first + 2, first + 3]
+    assert rows("id", "prompt") == [(first, "before")] + [(i, "question") for i in ids]
+
+
+def test_save_prompts_ids_stay_contiguous_under_concurrency(temp_database):
+    results = {}
+
+    def reserve(worker):
+        results[worker] = [database.save_prompts(f"prompt {worker}", count=10) for _ in range(5)]
+
+    threads = [threading.Thread(target=reserve, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    prompts = dict(rows("id", "prompt"))
+    reserved = [i for batches in results.values() for ids in batches for i in ids]
+    assert sorted(reserved) == sorted(prompts)
+    for worker, batches in results.items():
+        for ids in batches:
+            assert ids == list(range(ids[0], ids[0] + 10))
+            assert {prompts[i] for i in ids} == {f"prompt {worker}"}
+
+
+def test_row_ids_hand_off_fills_the_reserved_rows(temp_database, tmp_path, monkeypatch):
+    monkeypatch.setattr(discriminator, "output_log", JsonlWriter(tmp_path / "output.jsonl"))
+    other = database.save_prompts("other", count=2)
+    ids = database.save_prompts("question", count=3)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        discriminator.moderate_multiple_texts(
+            ["safe", "violent"], prompt="question", row_ids=ids,
+            verdicts=[verdict(), verdict("violence_and_threats")],
+        )
+
+    filled = {row[0]: row[1:] for row in rows("id", "answer", "violence_and_threats", "risk_score")}
+    assert filled[ids[0]] == ("safe", 0, 0)
+    assert filled[ids[1]] == ("violent", 1, 1)
+    # Unused reserved rows and other prompts' rows stay empty
+    assert filled[ids[2]] == (None, None, None)
+    assert all(filled[i] == (None, None, None) for i in other)
+
+
+def test_save_analysis_without_id_fills_the_prompts_next_empty_row(temp_database):
+    other = database.save_prompts("other", count=1)
+    ids = database.save_prompts("question", count=2)
+
+    database.save_analysis({"prompt": "question", "answer": "a", **verdict()})
+    database.save_analysis({"prompt": "question", "answer": "b", **verdict("pii")})
+
+    answers = dict(rows("id", "answer"))
+    assert [answers[i] for i in ids] == ["a", "b"]
+    assert answers[other[0]] is None
+    with pytest.raises(ValueError):
+        database.save_analysis({"prompt": "question", "answer": "c", **verdict()})
+
+
+def test_save_bulk_batch_counts_exactly_the_inserted_rows(temp_database):
+    database.save_prompts("not analysed yet", count=2)
+    database.save_bulk_batch(
+        "job", "input.jsonl", 3,
+        rejected=[("bad", "Prompt Injection")],
+        analyses=[{"prompt": "p", "answer": "a", **verdict("hate_and_discrimination")},
+                  {"prompt": "p", "answer": "b", **verdict()}],
+    )
+
+    assert database.load_bulk_checkpoint("job") == 3
+    day = rollups.fetch_rollups("day")
+    assert len(day) == 1
+    counts = dict(zip(rollups.COUNT_COLUMNS, day[0][1:]))
+    assert (counts["analysed"], counts["rejected"], counts["hate_and_discrimination"]) == (2, 1, 1)
+
+
+# ---------- flags bitmask ----------
+
+def test_flags_bitmask_round_trip():
+    record = verdict("sexual", "pii")
+    flags = flags_bitmask(record)
+
+    assert flags == 1 | 1 << FLAG_COLUMNS.index("pii")
+    assert decode_flags(flags) == ["sexual", "pii"]
+    assert flags_bitmask(verdict()) == 0
+
+
+def test_flagged_lookups_use_the_bitmask(temp_database):
+    ids = database.save_prompts("question", count=3)
+    database.save_analyses([
+        {"id": ids[0], "answer": "a", **verdict("health")},
+        {"id": ids[1], "answer": "b", **verdict("health", "financial")},
+        {"id": ids[2], "answer": "c", **verdict()},
+    ])
+
+    assert [row[1:] for row in rows("id", "flags")] == [
+        (flags_bitmask(verdict("health")),),
+        (flags_bitmask(verdict("health", "financial")),),
+        (0,),
+    ]
+    assert sorted(row[0] for row in database.fetch_flagged("health")) == ids[:2]
+    assert [row[0] for row in database.fetch_flagged("financial")] == [ids[1]]
+    assert database.fetch_flagged("pii") == []
+
+    counts = database.count_by_category()
+    assert (counts["health"], counts["financial"], counts["pii"]) == (2, 1, 0)
+
+
+def test_migrate_flags_backfills_existing_rows(temp_database):
+    ids = database.save_prompts("question", count=1)
+    with database.transaction() as conn:
+        conn.execute("UPDATE moderation_results SET law = 1, risk_score = 1, flags = NULL WHERE id = ?", ids)
+        database.migrate_flags(conn)
+
+    assert rows("flags") == [(flags_bitmask(verdict("law")),)]
+
+
+# ---------- rollups ----------
+
+def test_rollup_upserts_match_a_rebuild(temp_database):
+    for batch in range(3):
+        ids = database.save_prompts(f"question {batch}", count=2)
+        database.save_analyses([
+            {"id": ids[0], "answer": "a", **verdict("selfharm")},
+            {"id": ids[1], "answer": "b", **verdict("selfharm", "violence_and_threats")},
+        ])
+        database.save_rejected_prompt(f"rejected {batch}", "Prompt Injection")
+    database.save_rejected_prompts([("x", None), ("y", None)])
+
+    incremental = {g: rollups.fetch_rollups(g) for g in rollups.GRANULARITIES}
+    with database.transaction() as conn:
+        rollups.rebuild(conn)
+    rebuilt = {g: rollups.fetch_rollups(g) for g in rollups.GRANULARITIES}
+
+    assert incremental == rebuilt
+    counts = dict(zip(rollups.COUNT_COLUMNS, incremental["day"][0][1:]))
+    assert (counts["analysed"], counts["rejected"]) == (6, 5)
+    assert (counts["selfharm"], counts["risk_1"], counts["risk_2"]) == (6, 3, 3)
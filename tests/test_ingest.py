@@ -0,0 +1,54 @@
+from src.ingest import ingest_file
+
+
+class FakeStore:
+    """Chroma stand-in that, like Chroma, rejects duplicate ids in one upsert."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def get(self, where, include):
+        return {"ids": [i for i, (_, meta) in self.docs.items() if meta["source"] == where["source"]]}
+
+    def add_texts(self, texts, metadatas, ids):
+        if len(set(ids)) != len(ids):
+            raise ValueError("Expected IDs to be unique")
+        for i, text, meta in zip(ids, texts, metadatas):
+            self.docs[i] = (text, meta)
+
+    def delete(self, ids):
+        for i in ids:
+            del self.docs[i]
+
+
+class LineSplitter:
+    def split_text(self, text):
+        return [line for line in text.splitlines() if line]
+
+
+def test_repeated_chunk_is_stored_once(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("intro\nsame chunk\nother\nsame chunk\n", encoding="utf-8")
+    store = FakeStore()
+
+    assert ingest_file(store, path, LineSplitter(), batch_size=64) == (3, 1, 0)
+    assert sorted(text for text, _ in store.docs.values()) == ["intro", "other", "same chunk"]
+
+    # A second run finds everything already stored
+    assert ingest_file(store, path, LineSplitter(), batch_size=64) == (0, 4, 0)
+
+
+def test_repeated_chunk_across_batches(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("a\nb\na\nb\n", encoding="utf-8")
+    store = FakeStore()
+    assert ingest_file(store, path, LineSplitter(), batch_size=2) == (2, 2, 0)
+
+
+def test_removed_chunks_are_deleted(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("a\nb\n", encoding="utf-8")
+    store = FakeStore()
+    ingest_file(store, path, LineSplitter(), batch_size=64)
+    path.write_text("a\nc\n", encoding="utf-8")
+    assert ingest_file(store, path, LineSplitter(), batch_size=64) == (1, 1, 1)
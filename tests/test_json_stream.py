@@ -0,0 +1,59 @@
+import pytest
+
+from src.json_stream import VerdictParser, extract_json
+
+
+def feed_all(chunks):
+    parser = VerdictParser()
+    seen = [parser.feed(chunk) for chunk in chunks]
+    return parser, seen
+
+
+def test_violation_split_across_chunks():
+    parser, seen = feed_all(['{"vio', 'lation"', ': ', '1', ', "category": "Prompt Injection"}'])
+    assert seen == [None, None, None, None, 1]
+    assert parser.violation == 1
+
+
+def test_violation_known_before_the_rationale():
+    parser, seen = feed_all(['{"violation": 0,', ' "rationale": "Normal', ' question"}'])
+    assert seen == [0, 0, 0]
+
+
+@pytest.mark.parametrize("value, expected", [("1", 1), ("0", 0), ('"1"', 1), ("true", 1), ("false", 0)])
+def test_violation_value_forms(value, expected):
+    parser, _ = feed_all([f'{{"violation": {value}}}'])
+    assert parser.violation == expected
+
+
+def test_no_verdict_until_the_value_is_delimited():
+    parser = VerdictParser()
+    # "1" could still become "10": wait for the delimiter
+    assert parser.feed('{"violation": 1') is None
+    assert parser.feed("}") == 1
+
+
+def test_missing_delimiter_at_end_of_stream():
+    parser, seen = feed_all(['{"violation": 1'])
+    assert seen == [None]
+    # The caller then falls back to parsing the whole text, which fails
+    with pytest.raises(ValueError):
+        extract_json(parser.text)
+
+
+def test_first_violation_wins():
+    parser, _ = feed_all(['{"violation": 0, "rationale": "quoted \\"violation\\": 1, here"}'])
+    assert parser.violation == 0
+
+
+def test_non_json_output_never_decides():
+    parser, seen = feed_all(["I cannot ", "classify this ", "request."])
+    assert seen == [None, None, None]
+    with pytest.raises(ValueError):
+        extract_json(parser.text)
+
+
+def test_extract_json_recovers_fenced_and_wrapped_output():
+    assert extract_json('```json\n{"violation": 1}\n```') == {"violation": 1}
+    assert extract_json('Here is the verdict: {"violation": 0} Hope it helps.') == {"violation": 0}
+    assert extract_json('Result: [{"index": 0}]', list) == [{"index": 0}]
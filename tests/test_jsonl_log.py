@@ -0,0 +1,29 @@
+import gc
+
+import src.jsonl_log as jsonl_log
+from src.jsonl_log import JsonlWriter, iter_jsonl
+
+
+def test_records_are_buffered_until_size_or_exit(tmp_path):
+    path = tmp_path / "log.jsonl"
+    writer = JsonlWriter(path, buffer_size=3, flush_interval=3600, fsync=False)
+
+    writer.extend([{"i": 0}, {"i": 1}])
+    assert not path.exists()
+    writer.append({"i": 2})
+    assert [r["i"] for r in iter_jsonl(path)] == [0, 1, 2]
+
+    writer.append({"i": 3})
+    jsonl_log._flush_all()
+    assert [r["i"] for r in iter_jsonl(path)] == [0, 1, 2, 3]
+
+
+def test_writers_are_tracked_weakly_and_flush_when_collected(tmp_path):
+    path = tmp_path / "log.jsonl"
+    writer = JsonlWriter(path, buffer_size=100, flush_interval=3600, fsync=False)
+    writer.append({"i": 0})
+    assert writer in jsonl_log._writers
+
+    del writer
+    gc.collect()
+    assert [r["i"] for r in iter_jsonl(path)] == [0]
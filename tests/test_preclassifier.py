@@ -0,0 +1,33 @@
+from src.preclassifier import BENIGN_EXAMPLES, PreClassifier
+
+
+class CountingEmbeddings:
+    """Embeds every text as the same vector and counts the calls."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [1.0, 0.0]
+
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] if text in BENIGN_EXAMPLES else [0.0, 1.0] for text in texts]
+
+
+def test_embedding_stage_is_off_by_default():
+    embeddings = CountingEmbeddings()
+    classifier = PreClassifier(embeddings=embeddings, enabled=True, use_embeddings=False)
+
+    assert classifier.classify("What is the capital of France?") is None
+    assert classifier.classify("Hello!")["violation"] == 0
+    assert embeddings.queries == 0
+
+
+def test_embedding_stage_allows_near_benign_prompts_when_enabled():
+    embeddings = CountingEmbeddings()
+    classifier = PreClassifier(embeddings=embeddings, enabled=True, use_embeddings=True,
+                               benign_threshold=0.9, margin=0.3)
+
+    assert classifier.classify("What is the capital of France?")["violation"] == 0
+    assert embeddings.queries == 1
@@ -0,0 +1,43 @@
+from src.retrieval import Retriever
+from src.semantic_cache import SemanticCache
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [float(len(text)), 1.0]
+
+
+class FakeStore:
+    def __init__(self):
+        self.vectors = []
+
+    def similarity_search_by_vector(self, vector, k):
+        self.vectors.append(vector)
+        return [f"doc {i}" for i in range(k)]
+
+
+def test_cache_vector_is_passed_to_the_retriever():
+    embeddings, store = CountingEmbeddings(), FakeStore()
+    cache = SemanticCache(embeddings)
+    retriever = Retriever(store, embeddings, k=2, search_type="similarity", score_threshold=0, cache_size=0)
+
+    question = "How do I reset my password?"
+    assert cache.lookup(question) is None
+    docs = retriever.invoke(question, vector=cache.embedding(question))
+
+    assert docs == ["doc 0", "doc 1"]
+    # Raw embed_query output, not the cache's normalised copy
+    assert store.vectors == [[float(len(question)), 1.0]]
+    assert embeddings.queries == 1
+
+
+def test_invoke_embeds_without_a_vector():
+    embeddings, store = CountingEmbeddings(), FakeStore()
+    retriever = Retriever(store, embeddings, k=1, search_type="similarity", score_threshold=0, cache_size=0)
+
+    retriever.invoke("hello")
+    assert embeddings.queries == 1
@@ -0,0 +1,56 @@
+import json
+
+from src.run_groq import _parse_batch
+
+
+def item(index, violation, **extra):
+    return {"index": index, "violation": violation, "category": None, "rationale": "r", **extra}
+
+
+def test_out_of_order_items_map_back_to_their_inputs():
+    raw = json.dumps([item(2, 1), item(0, 0), item(1, 0)])
+    verdicts = _parse_batch(raw, 3)
+    assert {i: v["violation"] for i, v in verdicts.items()} == {0: 0, 1: 0, 2: 1}
+    assert all("index" not in v for v in verdicts.values())
+
+
+def test_missing_items_are_left_out():
+    verdicts = _parse_batch(json.dumps([item(0, 0), item(2, 1)]), 3)
+    assert sorted(verdicts) == [0, 2]
+
+
+def test_identical_duplicates_are_kept_once():
+    verdicts = _parse_batch(json.dumps([item(0, 1), item(0, 1, rationale="again"), item(1, 0)]), 2)
+    assert verdicts[0]["violation"] == 1
+    assert verdicts[0]["rationale"] == "r"
+    assert verdicts[1]["violation"] == 0
+
+
+def test_conflicting_duplicates_fall_back():
+    verdicts = _parse_batch(json.dumps([item(0, 0), item(0, 1), item(1, 0)]), 2)
+    assert sorted(verdicts) == [1]
+
+
+def test_invalid_items_are_skipped():
+    raw = json.dumps([
+        item(0, "1"),              # string value: normalised
+        item(1, 2),                # not 0/1
+        item(5, 0),                # index out of range
+        {"violation": 0},          # no index
+        item(2, None),             # no usable violation
+        "not an object",
+    ])
+    verdicts = _parse_batch(raw, 3)
+    assert list(verdicts) == [0]
+    assert verdicts[0]["violation"] == 1
+
+
+def test_wrapped_and_fenced_arrays():
+    assert list(_parse_batch(json.dumps({"results": [item(0, 0)]}), 1)) == [0]
+    assert list(_parse_batch(f"```json\n{json.dumps([item(0, 1)])}\n```", 1)) == [0]
+
+
+def test_non_json_output_gives_no_verdicts():
+    assert _parse_batch("Sorry, I can't help with that.", 2) == {}
+    assert _parse_batch("", 2) == {}
+    assert _parse_batch('{"violation": 1}', 2) == {}
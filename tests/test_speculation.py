@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src import query
+
+
+class LoopBoundChain:
+    """Like ChatOllama's async client: ainvoke only works on the loop it first ran on."""
+
+    def __init__(self):
+        self.loop = None
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return {"output_text": f"answer to {inputs['question']}"}
+
+    async def ainvoke(self, inputs):
+        loop = asyncio.get_running_loop()
+        if self.loop not in (None, loop):
+            raise RuntimeError("Event loop is closed")
+        self.loop = loop
+        return self.invoke(inputs)
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    chain = LoopBoundChain()
+    fakes = {
+        "qa_chain": SimpleNamespace(combine_documents_chain=chain),
+        "answer_cache": SimpleNamespace(lookup=lambda q: None, embedding=lambda q: [1.0]),
+        "retriever": SimpleNamespace(invoke=lambda q, vector=None: ["doc"]),
+    }
+    saved = {name: query._resources.get(name) for name in fakes}
+    for name, fake in fakes.items():
+        query.override_resource(name, fake)
+    monkeypatch.setattr(query, "groq_moderate_prompt", lambda q: {"violation": 0, "row_ids": None})
+    yield chain
+    for name, resource in saved.items():
+        if resource is None:
+            query._resources.pop(name, None)
+        else:
+            query.override_resource(name, resource)
+
+
+def test_speculative_generation_works_on_every_turn(fake_pipeline):
+    # moderate() runs one asyncio.run() per REPL turn
+    for turn in ("first question", "second question"):
+        mod, speculative = asyncio.run(query.moderate_with_speculation(turn, True, generate=True))
+        assert mod["violation"] == 0
+        assert speculative["response"] == {"question": turn, "result": f"answer to {turn}"}
+    assert fake_pipeline.calls == 2
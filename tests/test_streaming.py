@@ -0,0 +1,71 @@
+import threading
+
+from src.batching import BackgroundBatcher
+from src.streaming import stream_with_moderation
+
+SENTENCE = "A calm sentence about the weather. "
+
+
+def fake_classify(texts, calls=None):
+    if calls is not None:
+        calls.append(list(texts))
+    verdicts = []
+    for text in texts:
+        violent = "kill" in text
+        verdicts.append({"violence_and_threats": violent, "health": "doctor" in text,
+                         "risk_score": int(violent) + int("doctor" in text)})
+    return verdicts
+
+
+def test_only_new_text_plus_overlap_is_checked():
+    sent = []
+    result = stream_with_moderation(iter([SENTENCE] * 40), classify=lambda t: fake_classify(t, sent),
+                                    min_chars=100, overlap=20)
+    text = SENTENCE * 40
+    assert not result["aborted"]
+    assert result["text"] == text.strip()
+    # Each check covers at most the new text and `overlap` characters before it
+    assert sum(len(batch[0]) for batch in sent) <= len(text) + 20 * result["checks"]
+    assert result["verdict"]["risk_score"] == 0
+
+
+def test_abort_keeps_flagged_text_and_verdict():
+    chunks = [SENTENCE] * 10 + ["I will kill him. "] + [SENTENCE] * 10
+    result = stream_with_moderation(iter(chunks), classify=fake_classify, min_chars=100, overlap=20)
+    assert result["aborted"]
+    assert "kill" not in result["text"]
+    assert "kill" in result["flagged_text"]
+    assert result["verdict"]["violence_and_threats"] and result["flags"]["violence_and_threats"]
+
+
+def test_health_flag_alone_does_not_abort():
+    result = stream_with_moderation(iter(["Ask your doctor about it. "] * 10), classify=fake_classify,
+                                    min_chars=50)
+    assert not result["aborted"]
+    assert result["verdict"]["health"] and result["verdict"]["risk_score"] == 1
+
+
+def test_concurrent_streams_share_batches():
+    calls = []
+    batcher = BackgroundBatcher(lambda texts: fake_classify(texts, calls), window_ms=200)
+    barrier = threading.Barrier(5)
+
+    def chunks():
+        barrier.wait()
+        yield from [SENTENCE] * 10
+
+    results = [None] * 5
+
+    def run(i):
+        results[i] = stream_with_moderation(chunks(), classify=batcher, min_chars=100, overlap=20)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    checks = sum(result["checks"] for result in results)
+    assert all(not result["aborted"] for result in results)
+    assert len(calls) < checks